@@ -0,0 +1,108 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2013, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Read the Packages and Sources lists apt downloads into a rootdir
+directly, instead of opening an apt cache over every list of the
+rootdir just to look up a few versions.
+"""
+
+import hashlib
+import os
+
+from .version import debian_version_key
+
+
+def get_list_prefix(repo_url):
+    """
+    @return: the start of the file names apt gives the lists of
+    C{repo_url} in var/lib/apt/lists, e.g.
+    'packages.ros.org_ros_ubuntu_' for 'http://packages.ros.org/ros/ubuntu/'
+    """
+    uri = repo_url.split('://', 1)[-1].rstrip('/')
+    # credentials are not part of the file name
+    uri = uri.rsplit('@', 1)[-1]
+    return uri.replace('/', '_') + '_'
+
+
+def find_lists(rootdir, repo_url=None, suffix='_Packages'):
+    """
+    @param repo_url: only return the lists of this repository
+    @param suffix: '_Packages' or '_Sources'
+    @return: paths of the matching lists in the rootdir
+    """
+    prefix = get_list_prefix(repo_url) if repo_url else ''
+    lists_dir = os.path.join(rootdir, 'var/lib/apt/lists')
+    if not os.path.isdir(lists_dir):
+        return []
+    return sorted(os.path.join(lists_dir, f) for f in os.listdir(lists_dir)
+                  if f.startswith(prefix) and f.endswith(suffix))
+
+
+def get_fingerprint(rootdir, repo_url=None, suffixes=('_Packages', '_Sources')):
+    """
+    @param suffixes: the kinds of lists to include
+    @return: hash of the names, sizes and modification times of the
+    Packages and Sources lists in the rootdir, which changes whenever
+    apt downloads a different list
+    """
+    h = hashlib.sha1()
+    for suffix in suffixes:
+        for path in find_lists(rootdir, repo_url, suffix):
+            st = os.stat(path)
+            h.update('%s %d %d\n' % (os.path.basename(path), st.st_size, st.st_mtime))
+    return h.hexdigest()
+
+
+def read_versions(paths, prefix=''):
+    """
+    Scan lists for the packages whose name starts with C{prefix}.  Only
+    the Package and Version lines are looked at, so lists of the whole
+    archive can be skipped through quickly.
+    @return: dict mapping each matching package name to its newest
+    version by dpkg ordering, the candidate apt picks without pinning
+    """
+    versions = {}
+    for path in paths:
+        with open(path) as f:
+            name = None
+            for l in f:
+                if l.startswith('Package:'):
+                    name = l[8:].strip()
+                    if not name.startswith(prefix):
+                        name = None
+                elif name is not None and l.startswith('Version:'):
+                    version = l[8:].strip()
+                    if name not in versions or debian_version_key(version) > debian_version_key(versions[name]):
+                        versions[name] = version
+                    name = None
+    return versions
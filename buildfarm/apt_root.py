@@ -56,10 +56,18 @@ def set_default_sources(rootdir, distro, repo):
         sources_list.write(expand_template(template, d))
 
 
-def set_additional_sources(rootdir, distro, repo, source_name):
+def clear_default_sources(rootdir):
+    """ Leave only the repositories of sources.list.d configured """
+    with open(os.path.join(rootdir, "etc/apt/sources.list"),
+              'w') as sources_list:
+        sources_list.write("# only the repositories in sources.list.d are used\n")
+
+
+def set_additional_sources(rootdir, distro, repo, source_name, sources=True):
     """ Set the source lists for the default ubuntu and ros sources """
     d = {'distro': distro,
-         'repo': repo}
+         'repo': repo,
+         'sources': sources}
     with open(os.path.join(rootdir,
                            "etc/apt/sources.list.d/%s.list" % source_name),
               'w') as sources_list:
@@ -71,18 +79,29 @@ def set_additional_sources(rootdir, distro, repo, source_name):
 def setup_apt_rootdir(rootdir,
                       distro, arch,
                       mirror=None,
-                      additional_repos={}):
+                      additional_repos={},
+                      ros_only=False,
+                      sources=True):
+    """
+    @param ros_only: only configure C{additional_repos}, without the
+    Ubuntu archive, for callers which only need the ROS repository
+    metadata
+    @param sources: also fetch the Sources lists of C{additional_repos}
+    """
     setup_directories(rootdir)
-    if not mirror:
-        if arch in ['amd64', 'i386']:
-            repo = 'http://us.archive.ubuntu.com/ubuntu/'
-        else:
-            repo = 'http://ports.ubuntu.com/ubuntu-ports/'
+    if ros_only:
+        clear_default_sources(rootdir)
     else:
-        repo = mirror
-    set_default_sources(rootdir, distro, repo)
+        if not mirror:
+            if arch in ['amd64', 'i386']:
+                repo = 'http://us.archive.ubuntu.com/ubuntu/'
+            else:
+                repo = 'http://ports.ubuntu.com/ubuntu-ports/'
+        else:
+            repo = mirror
+        set_default_sources(rootdir, distro, repo)
     for repo_name, repo_url in additional_repos.iteritems():
-        set_additional_sources(rootdir, distro, repo_url, repo_name)
+        set_additional_sources(rootdir, distro, repo_url, repo_name, sources)
 
     d = {'arch': arch}
     path = os.path.join(rootdir, "etc/apt/apt.conf.d/51Architecture")
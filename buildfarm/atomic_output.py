@@ -0,0 +1,146 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2013, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Write output files which are published while they may be read, so that
+readers never see a partly written file, and keep track of their
+content hashes so that only the files which changed are published.
+"""
+
+import gzip
+import hashlib
+import os
+import tempfile
+
+HASHES_SUFFIX = '.sha256'
+
+
+class AtomicOutput(object):
+    """
+    File-like object writing to a temporary file next to C{path}.  A gzip
+    compressed copy and the sha256 of the content are computed in the
+    same pass.  L{close} renames both into place as C{path} and
+    C{path}.gz, L{abort} drops them.
+    """
+
+    def __init__(self, path, compress=True):
+        self.path = path
+        self.sha256 = None
+        dirname = os.path.dirname(os.path.abspath(path))
+        prefix = '.%s.' % os.path.basename(path)
+        fd, self._tmp_path = tempfile.mkstemp(dir=dirname, prefix=prefix)
+        self._file = os.fdopen(fd, 'wb')
+        self._hash = hashlib.sha256()
+        self._gz_tmp_path = self._gz_file = self._gz = None
+        if compress:
+            fd, self._gz_tmp_path = tempfile.mkstemp(dir=dirname, prefix=prefix)
+            self._gz_file = os.fdopen(fd, 'wb')
+            # no file name nor time in the header, so that the same
+            # content always compresses to the same bytes
+            self._gz = gzip.GzipFile('', 'wb', 9, self._gz_file, mtime=0)
+
+    def write(self, data):
+        self._file.write(data)
+        self._hash.update(data)
+        if self._gz is not None:
+            self._gz.write(data)
+
+    def _close_files(self):
+        self._file.close()
+        if self._gz is not None:
+            self._gz.close()
+            self._gz_file.close()
+
+    def close(self):
+        if self.sha256 is not None:
+            return
+        self._close_files()
+        # mkstemp only lets the owner read the files
+        if self._gz is not None:
+            os.chmod(self._gz_tmp_path, 0644)
+            os.rename(self._gz_tmp_path, self.path + '.gz')
+        os.chmod(self._tmp_path, 0644)
+        os.rename(self._tmp_path, self.path)
+        self.sha256 = self._hash.hexdigest()
+
+    def abort(self):
+        self._close_files()
+        for path in [self._tmp_path, self._gz_tmp_path]:
+            if path is not None and os.path.exists(path):
+                os.unlink(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def read_hashes(path):
+    """
+    @param path: file in the format of sha256sum
+    @return: dict mapping file names to their sha256, empty if C{path}
+    does not exist
+    """
+    hashes = {}
+    if not os.path.exists(path):
+        return hashes
+    with open(path) as f:
+        for l in f:
+            if l.strip():
+                sha256, name = l.rstrip('\n').split('  ', 1)
+                hashes[name] = sha256
+    return hashes
+
+
+def write_hashes(path, hashes):
+    with AtomicOutput(path, compress=False) as f:
+        for name in sorted(hashes):
+            f.write('%s  %s\n' % (hashes[name], name))
+
+
+def get_changed_files(hashes, published_hashes, compressed=()):
+    """
+    @param compressed: the names of the files which have a .gz sibling
+    @return: sorted names of the files whose hash differs from the one
+    they were published with, along with their .gz siblings
+    """
+    changed = []
+    for name, sha256 in hashes.iteritems():
+        if published_hashes.get(name) != sha256:
+            changed.append(name)
+            if name in compressed:
+                changed.append(name + '.gz')
+    return sorted(changed)
@@ -0,0 +1,112 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2013, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Streaming parser for the RFC822-style control data of debian Packages
+and Sources lists.
+"""
+
+
+def iter_stanzas(lines, fold_case=False):
+    """
+    Parse control data into one dict of fields per stanza.  C{lines}
+    can be any iterable of lines, such as an open, downloading or
+    decompressing file object, so only the current stanza is ever held
+    in memory.
+
+    Continuation lines are joined to the value of their field with
+    newlines, which keeps multi-line fields like Files or
+    Checksums-Sha256 intact (see L{parse_file_list}).
+
+    @param fold_case: lowercase all field names
+    """
+    fields = {}
+    key = None
+    parts = []
+    for l in lines:
+        l = l.rstrip('\r\n')
+        if not l.strip():
+            if key is not None:
+                fields[key] = '\n'.join(parts)
+                key = None
+            if fields:
+                yield fields
+                fields = {}
+        elif l[0].isspace():
+            if key is not None:
+                parts.append(l.strip())
+        else:
+            if key is not None:
+                fields[key] = '\n'.join(parts)
+            key, _, value = l.partition(':')
+            key = key.strip()
+            if fold_case:
+                key = key.lower()
+            parts = [value.strip()]
+    if key is not None:
+        fields[key] = '\n'.join(parts)
+    if fields:
+        yield fields
+
+
+def parse_file_list(value):
+    """
+    Split a multi-line field such as Files, Checksums-Sha1 or
+    Checksums-Sha256 into (checksum, size, filename) tuples.
+    """
+    return [tuple(l.split()) for l in value.split('\n') if l.strip()]
+
+
+def split_depends(value):
+    """
+    Split a Depends-like field into its comma separated relations.
+    """
+    if not value:
+        return []
+    return [d.strip() for d in value.split(',') if d.strip()]
+
+
+def get_relation_names(relation):
+    """
+    Strip version constraints, architecture qualifiers and
+    restrictions from a single relation of a Depends-like field.
+    Alternatives are all returned, e.g. 'a (>= 1) | b:any' yields
+    ['a', 'b'].
+    """
+    names = []
+    for alternative in relation.split('|'):
+        alternative = alternative.strip()
+        if not alternative:
+            continue
+        name = alternative.split(None, 1)[0].split('(', 1)[0].split('[', 1)[0]
+        names.append(name.split(':', 1)[0])
+    return names
@@ -121,7 +121,7 @@ if __name__ == "__main__":
             for a in arches:
                 dist_arch = "%s_%s" % (d, a)
                 specific_rootdir = os.path.join(rootdir, dist_arch)
-                setup_apt_root.setup_apt_rootdir(specific_rootdir, d, a, additional_repos=ros_repos)
+                setup_apt_root.setup_apt_rootdir(specific_rootdir, d, a, additional_repos=ros_repos, ros_only=True, sources=False)
                 print "setup rootdir %s" % specific_rootdir
 
                 packages[dist_arch] = list_packages(specific_rootdir, update=True, substring=args.substring)
@@ -139,7 +139,7 @@ if __name__ == "__main__":
             for a in arches:
                 dist_arch = "%s_%s" % (d, a)
                 specific_rootdir = os.path.join(rootdir, dist_arch)
-                setup_apt_root.setup_apt_rootdir(specific_rootdir, d, a, additional_repos=ros_repos)
+                setup_apt_root.setup_apt_rootdir(specific_rootdir, d, a, additional_repos=ros_repos, ros_only=True, sources=False)
                 print "setup rootdir %s" % specific_rootdir
 
                 get_packages(specific_rootdir, update=True, substring=args.substring, dest_dir=args.dest_dir)
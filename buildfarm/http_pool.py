@@ -0,0 +1,158 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2013, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Persistent HTTP connections for fetching repository metadata.
+
+urllib2 opens a new connection for every request.  The functions here
+keep one keep-alive connection per thread and host instead, so fetching
+dozens of index files from the same repository host costs one TCP (and
+TLS) handshake per thread.  Failures are reported with the urllib2
+exception types so callers can treat both the same way.
+"""
+
+import httplib
+import socket
+import threading
+import urllib2
+import urlparse
+from cStringIO import StringIO
+
+_MAX_REDIRECTS = 5
+
+
+class _Response(object):
+    """
+    The subset of the urllib2 response interface used by the index
+    cache.
+    """
+
+    def __init__(self, response, url):
+        self._response = response
+        self.url = url
+        self.code = response.status
+
+    def read(self, amt=None):
+        return self._response.read(amt)
+
+    def info(self):
+        return self._response.msg
+
+    def getcode(self):
+        return self.code
+
+    def close(self):
+        self._response.close()
+
+
+class ConnectionPool(object):
+
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _get_connections(self):
+        if not hasattr(self._local, 'connections'):
+            # {(scheme, netloc): (connection, last response)}
+            self._local.connections = {}
+        return self._local.connections
+
+    def _request(self, scheme, netloc, path, headers):
+        connections = self._get_connections()
+        key = (scheme, netloc)
+        for attempt in range(2):
+            connection, last_response = connections.get(key, (None, None))
+            # a connection whose last response was not read to the end
+            # cannot be reused
+            if connection and last_response and not last_response.isclosed():
+                connection.close()
+                connection = None
+            if connection is None:
+                if scheme == 'https':
+                    connection = httplib.HTTPSConnection(netloc, timeout=self.timeout)
+                else:
+                    connection = httplib.HTTPConnection(netloc, timeout=self.timeout)
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+            except (httplib.HTTPException, socket.error):
+                connection.close()
+                connections.pop(key, None)
+                # the server may have dropped an idle keep-alive
+                # connection, so retry once on a fresh one
+                if attempt:
+                    raise
+                continue
+            connections[key] = (connection, response)
+            return response
+
+    def urlopen(self, url, headers=None):
+        """
+        Send a GET request for C{url} over a pooled connection.
+        @param headers: dict of additional request headers
+        @return: response object with read(), info() and getcode()
+        @raise urllib2.HTTPError: for responses other than 200,
+        including 304 Not Modified
+        @raise urllib2.URLError: if the server cannot be reached
+        """
+        headers = dict(headers or {})
+        for _ in range(_MAX_REDIRECTS + 1):
+            parts = urlparse.urlsplit(url)
+            if parts.scheme not in ['http', 'https']:
+                # e.g. file:// urls
+                return urllib2.urlopen(urllib2.Request(url, headers=headers))
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+            try:
+                response = self._request(parts.scheme, parts.netloc, path, headers)
+            except (httplib.HTTPException, socket.error) as ex:
+                raise urllib2.URLError(ex)
+            if response.status in [301, 302, 303, 307] and response.getheader('Location'):
+                response.read()
+                url = urlparse.urljoin(url, response.getheader('Location'))
+                continue
+            if response.status != 200:
+                body = response.read()
+                raise urllib2.HTTPError(url, response.status, response.reason, response.msg, StringIO(body))
+            return _Response(response, url)
+        raise urllib2.HTTPError(url, response.status, 'Too many redirects', response.msg, StringIO(''))
+
+
+_default_pool = ConnectionPool()
+
+
+def urlopen(url, headers=None):
+    """
+    L{ConnectionPool.urlopen} on a pool shared by the whole process.
+    """
+    return _default_pool.urlopen(url, headers)
@@ -0,0 +1,377 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2013, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Persistent cache of the index files (Packages, Sources, Release)
+fetched from debian repositories.
+
+Every file is stored together with the validators the server sent
+(ETag and Last-Modified) and its sha256.  A later fetch first compares
+that hash against the one the dist's Release file advertises, and
+otherwise revalidates with a conditional GET over a pooled keep-alive
+connection (see L{http_pool}), so an unchanged index costs one small
+Release download or one 304 instead of a full transfer.  Index files
+are transferred in the most compressed variant the Release file lists
+and decompressed while they are read.  Where a dist publishes pdiffs,
+a changed index is brought up to date by patching the cached copy
+instead.
+"""
+
+import bz2
+import errno
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import urllib2
+import urlparse
+import zlib
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+from .deb822 import iter_stanzas, parse_file_list
+from . import http_pool, pdiff
+
+_default_cache = None
+
+# compressed variants of an index file in order of preference, with a
+# function opening them as a decompressing file object
+_COMPRESSIONS = [('.bz2', bz2.BZ2File), ('.gz', gzip.GzipFile), ('', open)]
+if lzma is not None:
+    _COMPRESSIONS.insert(0, ('.xz', lzma.LZMAFile))
+
+# incremental decompressors for the same variants, used when a file is
+# stored uncompressed as it is downloaded
+_DECOMPRESSORS = {'.bz2': bz2.BZ2Decompressor,
+                  '.gz': lambda: zlib.decompressobj(16 + zlib.MAX_WBITS),
+                  '': None}
+if lzma is not None:
+    _DECOMPRESSORS['.xz'] = lzma.LZMADecompressor
+# every suffix of a compressed file, whether it can be read or not
+_SUFFIXES = ['.xz', '.bz2', '.gz']
+
+
+def get_default_cache_dir():
+    import rospkg.environment
+    return os.path.join(rospkg.environment.get_ros_home(), 'buildfarm_rpms', 'index_cache')
+
+
+def get_default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = IndexCache(get_default_cache_dir())
+    return _default_cache
+
+
+class IndexCache(object):
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        # {path: (sha256, size)} of the Release file per dists url,
+        # read once per process
+        self._release_files = {}
+        # indexes are fetched from several threads at once, only one
+        # of them downloads a Release file
+        self._release_lock = threading.Lock()
+        # bytes not downloaded thanks to pdiffs during this process
+        self.pdiff_bytes_saved = 0
+
+    def _get_paths(self, url):
+        base = os.path.join(self.cache_dir, hashlib.sha1(url).hexdigest())
+        return base, base + '.json'
+
+    def _load_meta(self, meta_path):
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def _save_meta(self, meta_path, meta):
+        # several threads or cron jobs may share the cache directory
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+        os.rename(tmp_path, meta_path)
+
+    def _store(self, response, path, decompressor=None):
+        """
+        Stream C{response} into C{path}, replacing it atomically.
+        @param decompressor: object decompressing the data on the way
+        @return: sha256 of the stored data
+        """
+        sha256 = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    data = response.read(64 * 1024)
+                    if not data:
+                        break
+                    if decompressor:
+                        data = decompressor.decompress(data)
+                    sha256.update(data)
+                    f.write(data)
+                if hasattr(decompressor, 'flush'):
+                    data = decompressor.flush()
+                    sha256.update(data)
+                    f.write(data)
+            os.rename(tmp_path, path)
+        except:
+            os.remove(tmp_path)
+            raise
+        return sha256.hexdigest()
+
+    def fetch(self, url, expected_sha256=None, decompress=False, key=None):
+        """
+        Make sure an up to date copy of C{url} is in the cache.
+        @param expected_sha256: hash of the current file, if known from
+        a Release file.  A cached copy with this hash is used without
+        contacting the server.
+        @param decompress: store the file decompressed according to the
+        .xz, .bz2 or .gz extension of C{url}; C{expected_sha256} is then
+        the hash of the decompressed data
+        @param key: name of the cache entry, C{url} if None.  Files whose
+        url changes with their content share one entry this way, which
+        a new version replaces instead of adding another.
+        @return: path of the cached copy
+        @raise urllib2.URLError: if the file cannot be fetched
+        @raise IOError: if the file cannot be decompressed
+        """
+        if not os.path.isdir(self.cache_dir):
+            try:
+                os.makedirs(self.cache_dir)
+            except OSError as ex:
+                # another thread created it meanwhile
+                if ex.errno != errno.EEXIST:
+                    raise
+        decompressor = None
+        if decompress:
+            suffix = os.path.splitext(urlparse.urlsplit(url).path)[1]
+            if suffix in _SUFFIXES and suffix not in _DECOMPRESSORS:
+                raise IOError('No decompressor for %s' % url)
+            decompressor = _DECOMPRESSORS.get(suffix)
+        path, meta_path = self._get_paths((key or url) + ('#decompressed' if decompress else ''))
+        meta = self._load_meta(meta_path) if os.path.exists(path) else None
+
+        headers = {}
+        if meta:
+            if expected_sha256 and meta.get('sha256') == expected_sha256:
+                return path
+        # the validators only apply to the url they were sent for
+        if meta and meta.get('url') == url:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        try:
+            response = http_pool.urlopen(url, headers)
+        except urllib2.HTTPError as ex:
+            if ex.code == 304 and meta:
+                return path
+            raise
+        meta = {'url': url,
+                'etag': response.info().getheader('ETag'),
+                'last_modified': response.info().getheader('Last-Modified')}
+        meta['sha256'] = self._store(response, path, decompressor and decompressor())
+        self._save_meta(meta_path, meta)
+        return path
+
+    def get_release_files(self, dists_url):
+        """
+        @return: dict mapping the paths listed in the Release file of
+        C{dists_url} to their (sha256, size), empty if there is no
+        Release file
+        """
+        files = self._release_files.get(dists_url)
+        if files is not None:
+            return files
+        with self._release_lock:
+            if dists_url not in self._release_files:
+                files = {}
+                try:
+                    path = self.fetch(dists_url + '/Release')
+                except urllib2.URLError:
+                    path = None
+                if path:
+                    with open(path) as f:
+                        for fields in iter_stanzas(f, fold_case=True):
+                            for sha256, size, name in parse_file_list(fields.get('sha256', '')):
+                                files[name] = (sha256, int(size))
+                self._release_files[dists_url] = files
+            return self._release_files[dists_url]
+
+    def get_release_hashes(self, dists_url):
+        """
+        @return: dict mapping the paths listed in the Release file of
+        C{dists_url} to their sha256, empty if there is no Release file
+        """
+        files = self.get_release_files(dists_url)
+        return dict((name, sha256) for name, (sha256, _) in files.iteritems())
+
+    def fetch_index(self, dists_url, index_path):
+        """
+        Fetch an index file of a dist, e.g.
+        C{fetch_index(url + '/dists/precise', 'main/binary-amd64/Packages')}
+        @return: path of the cached copy
+        @raise urllib2.URLError: if the file cannot be fetched
+        """
+        expected_sha256 = self.get_release_hashes(dists_url).get(index_path)
+        return self.fetch(dists_url + '/' + index_path, expected_sha256)
+
+    def open_index(self, dists_url, index_path, fallback_suffix=''):
+        """
+        Fetch the smallest variant of an index file the dist's Release
+        file advertises (.xz, .bz2 or .gz before the uncompressed file)
+        and open it for reading.  Without a Release file
+        C{index_path + fallback_suffix} is fetched.
+        @param index_path: path of the uncompressed index relative to
+        C{dists_url}, e.g. 'main/source/Sources'
+        @return: file object yielding the decompressed contents
+        @raise urllib2.URLError: if the file cannot be fetched
+        """
+        suffix, open_ = self._get_compression(dists_url, index_path, fallback_suffix)
+        if index_path + '.diff/Index' in self.get_release_files(dists_url):
+            return open(self._fetch_patched_index(dists_url, index_path, suffix), 'rb')
+        return open_(self.fetch_index(dists_url, index_path + suffix), 'rb')
+
+    def fetch_index_file(self, dists_url, index_path, fallback_suffix=''):
+        """
+        Like L{open_index}, but keep the index uncompressed on disk, e.g.
+        to map it into memory.
+        @return: path of the up to date, uncompressed copy
+        @raise urllib2.URLError: if the file cannot be fetched
+        @raise IOError: if the file cannot be decompressed
+        """
+        suffix, _ = self._get_compression(dists_url, index_path, fallback_suffix)
+        files = self.get_release_files(dists_url)
+        if index_path + '.diff/Index' in files:
+            return self._fetch_patched_index(dists_url, index_path, suffix)
+        # the Release file lists the hash of the uncompressed index too
+        expected_sha256 = files.get(index_path, (None, None))[0]
+        return self.fetch(dists_url + '/' + index_path + suffix, expected_sha256, decompress=True)
+
+    def _get_compression(self, dists_url, index_path, fallback_suffix):
+        """
+        @return: (suffix, function opening a decompressing file) of the
+        most compressed variant of an index file the Release file lists
+        """
+        files = self.get_release_files(dists_url)
+        for suffix, open_ in _COMPRESSIONS:
+            if index_path + suffix in files:
+                return suffix, open_
+        return fallback_suffix, dict(_COMPRESSIONS)[fallback_suffix]
+
+    def _fetch_patched_index(self, dists_url, index_path, suffix):
+        """
+        Keep an uncompressed copy of an index file for which the dist
+        publishes pdiffs.  A stale copy is patched forward; a full
+        download of the C{suffix} variant only happens when there is no
+        copy yet or the patch history does not reach back to it.
+        @return: path of the up to date, uncompressed copy
+        """
+        url = dists_url + '/' + index_path
+        path, meta_path = self._get_paths(url)
+        meta = self._load_meta(meta_path) if os.path.exists(path) else None
+        files = self.get_release_files(dists_url)
+        if meta:
+            expected_sha256 = files.get(index_path, (None, None))[0]
+            if expected_sha256 and meta.get('sha256') == expected_sha256:
+                return path
+            try:
+                if self._apply_pdiffs(dists_url, index_path, path, meta):
+                    self._save_meta(meta_path, meta)
+                    return path
+            except (urllib2.URLError, pdiff.PdiffError, IOError, zlib.error) as ex:
+                logging.warn('Failed to apply pdiffs to %s: %s', url, ex)
+
+        response = http_pool.urlopen(url + suffix)
+        decompressor = _DECOMPRESSORS[suffix]
+        meta = {'url': url,
+                'sha256': self._store(response, path, decompressor and decompressor())}
+        self._save_meta(meta_path, meta)
+        return path
+
+    def _apply_pdiffs(self, dists_url, index_path, path, meta):
+        """
+        Patch the cached copy at C{path} to the current version of the
+        index and update C{meta} to match.
+        @return: False if the pdiff history does not reach back to the
+        cached copy
+        """
+        diff_url = dists_url + '/' + index_path + '.diff'
+        with open(self.fetch_index(dists_url, index_path + '.diff/Index')) as f:
+            diff_index = pdiff.parse_diff_index(f)
+
+        with open(path, 'rb') as f:
+            lines = f.readlines()
+        index_hash = hashlib.new(diff_index.hash_name, ''.join(lines)).hexdigest()
+        patch_names = diff_index.get_patches_since(index_hash)
+        if patch_names is None:
+            logging.info('pdiff history of %s does not reach back to the cached copy', diff_url)
+            return False
+
+        fetched = self.get_release_files(dists_url)[index_path + '.diff/Index'][1]
+        for name in patch_names:
+            data = http_pool.urlopen('%s/%s.gz' % (diff_url, name)).read()
+            fetched += len(data)
+            patch = zlib.decompress(data, 16 + zlib.MAX_WBITS)
+            if hashlib.new(diff_index.hash_name, patch).hexdigest() != diff_index.patches.get(name):
+                raise pdiff.PdiffError('Checksum mismatch for patch %s' % name)
+            pdiff.apply_ed_script(lines, patch.splitlines(True))
+
+        data = ''.join(lines)
+        if hashlib.new(diff_index.hash_name, data).hexdigest() != diff_index.current:
+            raise pdiff.PdiffError('Checksum mismatch after patching %s' % index_path)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.rename(tmp_path, path)
+        meta['sha256'] = hashlib.sha256(data).hexdigest()
+
+        # compare against the download the smallest variant would have cost
+        sizes = [size for name, (_, size) in self.get_release_files(dists_url).iteritems()
+                 if name.startswith(index_path) and name[len(index_path):] in _DECOMPRESSORS]
+        full_size = min(sizes) if sizes else fetched
+        self.pdiff_bytes_saved += max(full_size - fetched, 0)
+        logging.info('Applied %d pdiffs to %s, fetched %d instead of %d bytes',
+                     len(patch_names), index_path, fetched, full_size)
+        return True
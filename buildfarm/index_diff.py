@@ -0,0 +1,130 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2013, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Compare the package versions of two repository indexes, e.g. building
+against shadow-fixed before a sync, or one repository against a
+snapshot taken earlier.
+"""
+
+from .version import debian_version_key
+
+ADDED = 'added'
+REMOVED = 'removed'
+UPGRADED = 'upgraded'
+DOWNGRADED = 'downgraded'
+UNCHANGED = 'unchanged'
+
+CHANGE_KINDS = [ADDED, REMOVED, UPGRADED, DOWNGRADED, UNCHANGED]
+
+
+class IndexDiff(object):
+    """
+    Every package of two indexes classified by how its version changed.
+    Each kind is a list of (name, old version, new version) tuples
+    sorted by name, with None for the side a package is missing from.
+    """
+
+    def __init__(self):
+        self.changes = dict((kind, []) for kind in CHANGE_KINDS)
+
+    def add(self, kind, name, old_version, new_version):
+        self.changes[kind].append((name, old_version, new_version))
+
+    def __getitem__(self, kind):
+        return self.changes[kind]
+
+    def get_counts(self):
+        return dict((kind, len(changes)) for kind, changes in self.changes.iteritems())
+
+    def get_changed(self):
+        """
+        @return: (name, kind, old version, new version) of every package
+        which is not unchanged, sorted by name
+        """
+        return sorted((name, kind, old, new)
+                      for kind in [ADDED, REMOVED, UPGRADED, DOWNGRADED]
+                      for name, old, new in self.changes[kind])
+
+
+def snapshot_versions(index, prefix=None, key=debian_version_key):
+    """
+    @param index: a L{repo.PackagesIndex} or L{yum_repo.RpmIndex}
+    @param prefix: only include packages whose name starts with it
+    @param key: sort key ordering the versions, L{version.rpm_version_key}
+    for rpm indexes
+    @return: dict mapping each package name to its newest version
+    """
+    snapshot = {}
+    for name in index.names():
+        if prefix is None or name.startswith(prefix):
+            snapshot[name] = max(index.versions(name), key=key)
+    return snapshot
+
+
+def diff_versions(old, new, key=debian_version_key):
+    """
+    Classify every package of two {name: version} snapshots in a single
+    merge pass over their sorted names.
+    @rtype: L{IndexDiff}
+    """
+    diff = IndexDiff()
+    old_names = sorted(old)
+    new_names = sorted(new)
+    i = j = 0
+    while i < len(old_names) or j < len(new_names):
+        if j == len(new_names) or (i < len(old_names) and old_names[i] < new_names[j]):
+            name = old_names[i]
+            diff.add(REMOVED, name, old[name], None)
+            i += 1
+        elif i == len(old_names) or new_names[j] < old_names[i]:
+            name = new_names[j]
+            diff.add(ADDED, name, None, new[name])
+            j += 1
+        else:
+            name = old_names[i]
+            order = cmp(key(new[name]), key(old[name]))
+            kind = UPGRADED if order > 0 else DOWNGRADED if order < 0 else UNCHANGED
+            diff.add(kind, name, old[name], new[name])
+            i += 1
+            j += 1
+    return diff
+
+
+def diff_indexes(old, new, prefix=None, key=debian_version_key):
+    """
+    L{diff_versions} of two indexes, comparing the newest version of
+    each package.
+    @rtype: L{IndexDiff}
+    """
+    return diff_versions(snapshot_versions(old, prefix, key),
+                         snapshot_versions(new, prefix, key), key)
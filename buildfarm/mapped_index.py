@@ -0,0 +1,140 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2013, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Lookups of single packages in a large Packages or Sources file without
+parsing all of it.
+
+The uncompressed file is mapped into memory and a sidecar file next to
+it maps every package name to the byte ranges of its stanzas.  The
+sidecar is written by one pass over the lines the first time a file is
+used and reused while the file does not change, so a lookup parses
+only the stanzas it asks for.
+"""
+
+import json
+import mmap
+import os
+import tempfile
+
+from .deb822 import iter_stanzas
+
+SIDECAR_SUFFIX = '.offsets'
+
+
+def build_offsets(f):
+    """
+    @param f: the Packages or Sources file, opened in binary mode
+    @return: dict mapping package names to lists of (start, end) byte
+    ranges of their stanzas
+    """
+    offsets = {}
+    name = None
+    start = pos = 0
+    for l in f:
+        if not l.strip():
+            if name is not None:
+                offsets.setdefault(name, []).append((start, pos))
+                name = None
+            start = pos + len(l)
+        elif l[:8].lower() == 'package:':
+            name = l[8:].strip()
+        pos += len(l)
+    if name is not None:
+        offsets.setdefault(name, []).append((start, pos))
+    return offsets
+
+
+class MappedIndex(object):
+    """
+    Read-only view of an uncompressed Packages or Sources file which
+    parses stanzas on demand.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        st = os.fstat(self._file.fileno())
+        # mmap cannot map an empty file
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else None
+        self._offsets = self._load_offsets(st)
+
+    def _load_offsets(self, st):
+        sidecar_path = self.path + SIDECAR_SUFFIX
+        try:
+            with open(sidecar_path) as f:
+                sidecar = json.load(f)
+            if sidecar['size'] == st.st_size and sidecar['mtime'] == st.st_mtime:
+                # json returns unicode names
+                return dict((name.encode('utf-8'), ranges) for name, ranges in sidecar['offsets'].iteritems())
+        except (IOError, ValueError, KeyError):
+            pass
+
+        self._file.seek(0)
+        offsets = build_offsets(self._file)
+        sidecar = {'size': st.st_size, 'mtime': st.st_mtime, 'offsets': offsets}
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(sidecar_path))
+            with os.fdopen(fd, 'w') as f:
+                json.dump(sidecar, f)
+            os.rename(tmp_path, sidecar_path)
+        except (IOError, OSError):
+            # the lookups still work, the sidecar is only a shortcut
+            pass
+        return offsets
+
+    def __contains__(self, name):
+        return name in self._offsets
+
+    def __len__(self):
+        return sum(len(ranges) for ranges in self._offsets.itervalues())
+
+    def names(self):
+        return self._offsets.keys()
+
+    def get_stanzas(self, name):
+        """
+        @return: list of field dicts of the stanzas for C{name}, with
+        lowercase field names
+        """
+        stanzas = []
+        for start, end in self._offsets.get(name, []):
+            stanzas.extend(iter_stanzas(self._map[start:end].splitlines(True), fold_case=True))
+        return stanzas
+
+    def versions(self, name):
+        return [fields['version'] for fields in self.get_stanzas(name) if 'version' in fields]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
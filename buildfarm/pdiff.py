@@ -0,0 +1,130 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2013, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Support for the pdiff (Packages.diff/Index) incremental updates that
+debian repositories publish next to their index files.
+"""
+
+import re
+
+from .deb822 import iter_stanzas, parse_file_list
+
+_ed_command_rx = re.compile(r'^(\d+)(?:,(\d+))?([acd])$')
+
+
+class PdiffError(Exception):
+    pass
+
+
+class DiffIndex(object):
+    """
+    Contents of a Packages.diff/Index file.  Hashes are taken from the
+    SHA256 fields when present and from the SHA1 fields otherwise.
+    """
+
+    def __init__(self, hash_name, current, history, patches):
+        self.hash_name = hash_name
+        self.current = current
+        # [(hash of the index before the patch, patch name)]
+        self.history = history
+        # {patch name: hash of the uncompressed patch}
+        self.patches = patches
+
+    def get_patches_since(self, index_hash):
+        """
+        @return: names of the patches to apply, in order, to bring an
+        index with C{index_hash} up to date, or None if the history does
+        not reach back that far
+        """
+        if index_hash == self.current:
+            return []
+        for i, (h, _) in enumerate(self.history):
+            if h == index_hash:
+                return [name for _, name in self.history[i:]]
+        return None
+
+
+def parse_diff_index(lines):
+    """
+    @param lines: the Index file as an iterable of lines
+    @rtype: L{DiffIndex}
+    """
+    fields = {}
+    for stanza in iter_stanzas(lines, fold_case=True):
+        fields.update(stanza)
+    for hash_name in ['sha256', 'sha1']:
+        if hash_name + '-current' in fields:
+            break
+    else:
+        raise PdiffError('Index lists no SHA256-Current or SHA1-Current')
+    current = fields[hash_name + '-current'].split()[0]
+    history = [(h, name) for h, _, name in parse_file_list(fields.get(hash_name + '-history', ''))]
+    patches = dict((name, h) for h, _, name in parse_file_list(fields.get(hash_name + '-patches', '')))
+    return DiffIndex(hash_name, current, history, patches)
+
+
+def apply_ed_script(lines, script):
+    """
+    Apply a patch in the 'diff --ed' format pdiffs use to C{lines} in
+    place.  The commands of such a script address lines from the end of
+    the file backwards, so each one can be applied as it is read.
+    @param lines: the list of lines to patch, including line endings
+    @param script: the patch as an iterable of lines
+    @raise PdiffError: if the script cannot be parsed
+    """
+    script = iter(script)
+    for command in script:
+        command = command.rstrip('\n')
+        if not command:
+            continue
+        m = _ed_command_rx.match(command)
+        if not m:
+            raise PdiffError('Unsupported ed command: %r' % command)
+        first = int(m.group(1))
+        last = int(m.group(2) or first)
+        action = m.group(3)
+
+        added = []
+        if action in 'ac':
+            for l in script:
+                if l.rstrip('\n') == '.':
+                    break
+                added.append(l)
+            else:
+                raise PdiffError('Unterminated ed insert at %r' % command)
+        if action == 'a':
+            lines[first:first] = added
+        elif action == 'c':
+            lines[first - 1:last] = added
+        else:
+            del lines[first - 1:last]
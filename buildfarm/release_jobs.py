@@ -53,7 +53,8 @@ def compute_missing(distros, arches, fqdn, rosdistro, sourcerpm_only=False):
     else:
         target_distros = rd.get_target_distros()
 
-    missing = {}
+    # (rpm name, expected version) of every package with a version
+    wet_expected = {}
     for short_package_name in rd.get_package_list():
         #print ('Analyzing WET stack "%s" for "%s"' % (r['url'], target_distros))
 
@@ -65,26 +66,14 @@ def compute_missing(distros, arches, fqdn, rosdistro, sourcerpm_only=False):
         if not expected_version:
             print("Skipping package %s with no version" % short_package_name)
             continue
+        wet_expected[short_package_name] = (rpm_name, str(expected_version))
 
-        missing[short_package_name] = []
-        for d in target_distros:
-            if not repo.rpm_in_repo(repo_url, rpm_name, str(expected_version) + d, d, arch='na', source=True):
-                missing[short_package_name].append('%s_source' % d)
-            if not sourcerpm_only:
-                for a in arches:
-                    if not repo.rpm_in_repo(repo_url, rpm_name, str(expected_version) + ".*", d, a):
-                        missing[short_package_name].append('%s_%s' % (d, a))
-
+    dry_expected = {}
     if not sourcerpm_only:
         #dry stacks
         # dry dependencies
         dist = load_distro(distro_uri(rosdistro))
 
-        distro_arches = []
-        for d in target_distros:
-            for a in arches:
-                distro_arches.append((d, a))
-
         for s in dist.stacks:
             #print ("Analyzing DRY job [%s]" % s)
             expected_version = dry_get_stack_version(s, dist)
@@ -92,11 +81,54 @@ def compute_missing(distros, arches, fqdn, rosdistro, sourcerpm_only=False):
             if not expected_version:
                 print("Skipping package %s with no version" % s)
                 continue
-            missing[s] = []
-            # for each distro arch check if the rpm is present. If not trigger the build.
-            for (d, a) in distro_arches:
-                if not repo.rpm_in_repo(repo_url, rpmify_package_name(rosdistro, s), expected_version + ".*", d, a):
-                    missing[s].append('%s_%s' % (d, a))
+            dry_expected[s] = (rpmify_package_name(rosdistro, s), expected_version)
+
+    distro_arches = []
+    if not sourcerpm_only:
+        for d in target_distros:
+            for a in arches:
+                distro_arches.append((d, a))
+
+    # fetch all indexes concurrently, then check every expected
+    # package against each of them in one pass.  The expected release
+    # only has to start the release in the repo.
+    failed = repo.prefetch_rpm_indexes([(repo_url, d, 'SRPMS', True) for d in target_distros] +
+                                       [(repo_url, d, a, False) for (d, a) in distro_arches])
+    unavailable = set()
+    for (_, d, a, source), ex in failed.iteritems():
+        label = (d, 'source') if source else (d, a)
+        print("Index of %s_%s is unavailable, counting all packages as missing: %s" % (label[0], label[1], ex))
+        unavailable.add(label)
+    source_indexes = dict(((d, 'source'), repo.get_rpm_index(repo_url, d, 'SRPMS', source=True))
+                          for d in target_distros if (d, 'source') not in unavailable)
+    binary_indexes = dict(((d, a), repo.get_rpm_index(repo_url, d, a))
+                          for (d, a) in distro_arches if (d, a) not in unavailable)
+    # wet packages and dry stacks are checked separately, as they may
+    # share rpm names
+    wet_missing = repo.compute_missing_matrix(wet_expected.values(), source_indexes, full_match=False)
+    wet_missing.update(repo.compute_missing_matrix(wet_expected.values(), binary_indexes, full_match=False))
+    dry_missing = repo.compute_missing_matrix(dry_expected.values(), binary_indexes, full_match=False)
+    # nothing can be found in an index which cannot be fetched, e.g.
+    # for a new distro or arch, so everything gets built for it
+    for label in unavailable:
+        wet_missing[label] = set(rpm_name for rpm_name, _ in wet_expected.itervalues())
+        if label[1] != 'source':
+            dry_missing[label] = set(rpm_name for rpm_name, _ in dry_expected.itervalues())
+
+    missing = {}
+    for short_package_name, (rpm_name, _) in wet_expected.iteritems():
+        missing[short_package_name] = []
+        for d in target_distros:
+            if rpm_name in wet_missing.get((d, 'source'), ()):
+                missing[short_package_name].append('%s_source' % d)
+            if not sourcerpm_only:
+                for a in arches:
+                    if rpm_name in wet_missing.get((d, a), ()):
+                        missing[short_package_name].append('%s_%s' % (d, a))
+
+    for s, (rpm_name, _) in dry_expected.iteritems():
+        # for each distro arch check if the rpm is present. If not trigger the build.
+        missing[s] = ['%s_%s' % (d, a) for (d, a) in distro_arches if rpm_name in dry_missing.get((d, a), ())]
 
     return missing
 
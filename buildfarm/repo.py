@@ -36,13 +36,18 @@
 Utilities for reading state from a debian repo
 """
 
-import urllib
 import urllib2
 import re
-import os
-import tempfile
-import shutil
-import gzip
+import threading
+import urlparse
+from array import array
+from collections import deque
+from cStringIO import StringIO
+from itertools import izip
+
+from . import index_cache, mapped_index, string_table, yum_repo
+from .deb822 import iter_stanzas, split_depends, get_relation_names
+from .version import debian_version_key, newest_version
 
 #from .core import debianize_name
 
@@ -52,6 +57,67 @@ class BadRepo(Exception):
 
 _Packages_cache = {}
 
+# compiled version patterns shared by all PackagesIndex lookups
+_version_rx_cache = {}
+
+
+def _dists_url(repo_url, os_platform):
+    # this is very bad.  This script is assuming the layout of the
+    # repo has a subdirectory ubuntu.  I can't parameterize it out
+    # without potentially breaking a lot. Using an if statement to get
+    # it to work.
+    if 'packages.ros.org/ros' in repo_url or 'shadow' in repo_url:
+        return repo_url + '/ubuntu/dists/%s' % os_platform
+    return repo_url + '/dists/%s' % os_platform
+
+
+def _packages_path(arch):
+    return 'main/binary-%s/Packages' % arch
+
+_SOURCES_PATH = 'main/source/Sources'
+
+
+def _packages_url(repo_url, os_platform, arch):
+    return _dists_url(repo_url, os_platform) + '/' + _packages_path(arch)
+
+
+def _sources_url(repo_url, os_platform):
+    return _dists_url(repo_url, os_platform) + '/' + _SOURCES_PATH
+
+
+def _open_index(repo_url, os_platform, index_path, fallback_suffix=''):
+    """
+    Bring the on-disk copy of an index file of the repo up to date and
+    open it.  The most compressed variant the Release file lists is
+    transferred and unchanged files are revalidated instead of
+    downloaded again, see L{index_cache.IndexCache}.
+    @return: file object yielding the decompressed index
+    @raise BadRepo: if the file cannot be fetched
+    """
+    return _call_index_cache('open_index', repo_url, os_platform, index_path, fallback_suffix)
+
+
+def _fetch_index_file(repo_url, os_platform, index_path, fallback_suffix=''):
+    """
+    Bring the on-disk copy of an index file of the repo up to date.
+    @return: path of the uncompressed copy
+    @raise BadRepo: if the file cannot be fetched
+    """
+    return _call_index_cache('fetch_index_file', repo_url, os_platform, index_path, fallback_suffix)
+
+
+def _call_index_cache(method, repo_url, os_platform, index_path, fallback_suffix):
+    dists_url = _dists_url(repo_url, os_platform)
+    url = dists_url + '/' + index_path
+    try:
+        return getattr(index_cache.get_default_cache(), method)(dists_url, index_path, fallback_suffix)
+    except urllib2.HTTPError as ex:
+        raise BadRepo("[%s]: %s (HTTPError: %s)" % (repo_url, url, ex))
+    except urllib2.URLError as ex:
+        raise BadRepo("[%s]: %s (URLError %s)" % (repo_url, url, ex))
+    except:
+        raise BadRepo("[%s]: %s" % (repo_url, url))
+
 
 def get_Packages(repo_url, os_platform, arch, cache=None):
     """
@@ -63,25 +129,12 @@ def get_Packages(repo_url, os_platform, arch, cache=None):
     if cache is None:
         cache = _Packages_cache
 
-    # this is very bad.  This script is assuming the layout of the
-    # repo has a subdirectory ubuntu.  I can't parameterize it out
-    # without potentially breaking a lot. Using an if statement to get
-    # it to work.
-    if 'packages.ros.org/ros' in repo_url or 'shadow' in repo_url:
-        packages_url = repo_url + '/ubuntu/dists/%(os_platform)s/main/binary-%(arch)s/Packages' % locals()
-    else:
-        packages_url = repo_url + '/dists/%(os_platform)s/main/binary-%(arch)s/Packages' % locals()
+    packages_url = _packages_url(repo_url, os_platform, arch)
     if packages_url in cache:
         return cache[packages_url]
     else:
-        try:
-            cache[packages_url] = retval = urllib2.urlopen(packages_url).read()
-        except urllib2.HTTPError as ex:
-            raise BadRepo("[%s]: %s (HTTPError: %s)" % (repo_url, packages_url, ex))
-        except urllib2.URLError as ex:
-            raise BadRepo("[%s]: %s (URLError %s)" % (repo_url, packages_url, ex))
-        except:
-            raise BadRepo("[%s]: %s" % (repo_url, packages_url))
+        with _open_index(repo_url, os_platform, _packages_path(arch)) as f:
+            cache[packages_url] = retval = f.read()
     return retval
 
 
@@ -95,51 +148,346 @@ def get_source_Packages(repo_url, os_platform, cache=None):
     if cache is None:
         cache = _Packages_cache
 
-    # this is very bad.  This script is assuming the layout of the
-    # repo has a subdirectory ubuntu.  I can't parameterize it out
-    # without potentially breaking a lot. Using an if statement to get
-    # it to work.
-    if 'packages.ros.org/ros' in repo_url or 'shadow' in repo_url:
-        packages_url = repo_url + '/ubuntu/dists/%(os_platform)s/main/source/Sources.gz' % locals()
-    else:
-        packages_url = repo_url + '/dists/%(os_platform)s/main/source/Sources.gz' % locals()
+    packages_url = _sources_url(repo_url, os_platform)
     if packages_url in cache:
         return cache[packages_url]
     else:
-        d = tempfile.mkdtemp()
-        try:
-            tar_f = urllib.urlretrieve(packages_url, os.path.join(d, 'Source.gz'))
-            tar_h = gzip.open(tar_f[0], 'r:gz')
-            cache[packages_url] = retval = tar_h.read()
-        except urllib2.HTTPError:
-            raise BadRepo("[%s]: %s" % (repo_url, packages_url))
-        finally:
-            if os.path.isdir(d):
-                shutil.rmtree(d)
+        with _open_index(repo_url, os_platform, _SOURCES_PATH, '.gz') as f:
+            cache[packages_url] = retval = f.read()
     return retval
 
 
+class PackageEntry(object):
+    """
+    A single stanza of a Packages or Sources list.
+    """
+    __slots__ = ['name', 'version', 'depends', 'distro']
+
+    def __init__(self, name, version, depends, distro):
+        self.name = name
+        self.version = version
+        self.depends = depends
+        self.distro = distro
+
+    def __iter__(self):
+        # unpacks like the (package, version, depends, distro) tuples
+        # returned by parse_Packages
+        return iter((self.name, self.version, self.depends, self.distro))
+
+
+def _get_build_stamp(version):
+    return version[version.find('-') + 1:version.find('~')]
+
+
+class IndexSummary(object):
+    """
+    Totals of a Packages or Sources list, collected while it is parsed
+    so that the queries the sync jobs run do not walk the index again.
+    """
+
+    def __init__(self):
+        # {rosdistro: packages named ros-<rosdistro>-*}
+        self.package_counts = {}
+        # {WG-rosdistro field: (sort key, newest build stamp)}
+        self._build_stamps = {}
+        # {Architecture field: packages}
+        self.arch_counts = {}
+
+    def add(self, name, version, distro=None, arch=None):
+        if name.startswith('ros-'):
+            parts = name.split('-', 2)
+            if len(parts) == 3:
+                self.package_counts[parts[1]] = self.package_counts.get(parts[1], 0) + 1
+        stamp = _get_build_stamp(version)
+        try:
+            key = debian_version_key(stamp)
+        except ValueError:
+            key = None
+        if key is not None and (distro not in self._build_stamps or key > self._build_stamps[distro][0]):
+            self._build_stamps[distro] = (key, stamp)
+        self.arch_counts[arch] = self.arch_counts.get(arch, 0) + 1
+
+    def count_packages(self, rosdistro):
+        return self.package_counts.get(rosdistro, 0)
+
+    def get_build_stamp(self, distro):
+        """
+        @param distro: value of the WG-rosdistro field
+        @return: the newest build stamp among the packages of
+        C{distro}, or None if there are none
+        """
+        if distro not in self._build_stamps:
+            return None
+        return self._build_stamps[distro][1]
+
+
+class PackagesIndex(object):
+    """
+    Parsed view of a Packages or Sources list keyed by package name.
+    An index is built once per fetched list and shared by all queries
+    against it, so a lookup is a dict access instead of a scan of the
+    raw text.
+
+    Stanzas are stored column-wise, as rows of ids into the tables of
+    L{string_table} which all indexes share, and L{PackageEntry}
+    objects are only created when they are asked for.
+    """
+
+    def __init__(self):
+        # {name: last row of that name}
+        self._last_rows = {}
+        self._name_ids = array('i')
+        self._version_ids = array('i')
+        self._depends_ids = array('i')
+        self._distro_ids = array('i')
+        # previous row of the same name, -1 for the first
+        self._previous_rows = array('i')
+        self._reverse_depends = None
+        self._dependents_cache = {}
+        self.summary = IndexSummary()
+
+    def add(self, name, version, depends=None, distro=None, arch=None):
+        self.summary.add(name, version, distro, arch)
+        strings = string_table.strings
+        name = strings.get_canonical(name)
+        self._previous_rows.append(self._last_rows.get(name, -1))
+        self._last_rows[name] = len(self._name_ids)
+        self._name_ids.append(strings.get_id(name))
+        self._version_ids.append(strings.get_id(version))
+        depends = tuple(strings.get_canonical(d) for d in depends or [])
+        self._depends_ids.append(string_table.depends.get_id(depends))
+        self._distro_ids.append(strings.get_id(distro))
+        self._reverse_depends = None
+        self._dependents_cache = {}
+
+    def _get_rows(self, name):
+        rows = []
+        row = self._last_rows.get(name, -1)
+        while row != -1:
+            rows.append(row)
+            row = self._previous_rows[row]
+        rows.reverse()
+        return rows
+
+    def _get_entry(self, row):
+        strings = string_table.strings
+        return PackageEntry(strings[self._name_ids[row]],
+                            strings[self._version_ids[row]],
+                            string_table.depends[self._depends_ids[row]],
+                            strings[self._distro_ids[row]])
+
+    def __contains__(self, name):
+        return name in self._last_rows
+
+    def __len__(self):
+        return len(self._name_ids)
+
+    def names(self):
+        return self._last_rows.keys()
+
+    def entries(self, name=None):
+        """
+        @return: all L{PackageEntry}s for C{name}, or of the whole
+        index if C{name} is None
+        """
+        if name is not None:
+            rows = self._get_rows(name)
+        else:
+            rows = xrange(len(self._name_ids))
+        return [self._get_entry(row) for row in rows]
+
+    def versions(self, name):
+        strings = string_table.strings
+        return [strings[self._version_ids[row]] for row in self._get_rows(name)]
+
+    def has_version(self, name, version, use_regex=True, full_match=True):
+        """
+        @param version: version of C{name} to look for.  If
+        C{use_regex} it is a regular expression, otherwise a literal
+        version prefix.
+        @param full_match: require C{version} to match the whole
+        version string rather than a prefix of it
+        """
+        return _match_versions(self.versions(name), version, use_regex, full_match)
+
+    def get_reverse_depends(self):
+        """
+        @return: dict mapping package names to the set of packages that
+        depend on them, ignoring version constraints and counting every
+        alternative of a dependency
+        """
+        if self._reverse_depends is None:
+            strings = string_table.strings
+            reverse_depends = {}
+            # the same dependency lists recur across versions and arches
+            depends_names = {}
+            for name_id, depends_id in izip(self._name_ids, self._depends_ids):
+                if depends_id not in depends_names:
+                    depends_names[depends_id] = set(dep for relation in string_table.depends[depends_id]
+                                                    for dep in get_relation_names(relation))
+                name = strings[name_id]
+                for dep in depends_names[depends_id]:
+                    reverse_depends.setdefault(dep, set()).add(name)
+            self._reverse_depends = reverse_depends
+        return self._reverse_depends
+
+    def get_dependents(self, names):
+        """
+        Find all packages which depend on any of C{names}, directly or
+        transitively, in a single walk of the reverse dependencies.
+        Results are memoized per set of names.
+        @return: frozenset of package names
+        """
+        key = frozenset(names)
+        if key not in self._dependents_cache:
+            reverse_depends = self.get_reverse_depends()
+            dependents = set()
+            queue = deque(key)
+            while queue:
+                for package in reverse_depends.get(queue.popleft(), ()):
+                    if package not in dependents:
+                        dependents.add(package)
+                        queue.append(package)
+            self._dependents_cache[key] = frozenset(dependents)
+        return self._dependents_cache[key]
+
+
+def _match_versions(versions, version, use_regex=True, full_match=True):
+    if not versions:
+        return False
+    if not use_regex:
+        return any(v.startswith(version) for v in versions)
+    version_rx = _get_version_rx(version, full_match)
+    return any(version_rx.match(v) for v in versions)
+
+
+def _get_version_rx(version, full_match=True):
+    key = (version, full_match)
+    if key not in _version_rx_cache:
+        _version_rx_cache[key] = re.compile(version + '$' if full_match else version)
+    return _version_rx_cache[key]
+
+
+def parse_Packages_index(packagelist):
+    """
+    Parse debian Packages or Sources list into a L{PackagesIndex}
+    @param packagelist: the list as a string or an iterable of lines
+    """
+    index = PackagesIndex()
+    for package, version, deps, distro, arch in _iter_Packages_fields(packagelist):
+        index.add(package, version, deps, distro, arch)
+    return index
+
+
+def get_Packages_index(repo_url, os_platform, arch, cache=None, source=False):
+    """
+    Retrieve the parsed package list from the shadow repo.  The index
+    is stored in C{cache} next to the raw list it was built from.
+    @raise BadRepo: if repo does not exist
+    """
+    if cache is None:
+        cache = _Packages_cache
+
+    if source:
+        packages_url = _sources_url(repo_url, os_platform)
+    else:
+        packages_url = _packages_url(repo_url, os_platform, arch)
+    key = ('index', packages_url)
+    if key not in cache:
+        if packages_url in cache:
+            cache[key] = parse_Packages_index(cache[packages_url])
+        else:
+            if source:
+                index_path, fallback_suffix = _SOURCES_PATH, '.gz'
+            else:
+                index_path, fallback_suffix = _packages_path(arch), ''
+            # parse straight from the decompressing file rather than
+            # holding the whole list in memory first
+            with _open_index(repo_url, os_platform, index_path, fallback_suffix) as f:
+                cache[key] = parse_Packages_index(f)
+    return cache[key]
+
+
+def fetch_concurrently(fetch, targets, max_workers=8, max_per_host=4, errors=(BadRepo,)):
+    """
+    Call C{fetch(*target)} for every target from a pool of threads,
+    with at most C{max_per_host} requests in flight per repository
+    host.  The first element of each target must be the repo url.
+    @param errors: exception types to collect instead of propagate
+    @return: dict mapping the targets which failed to the exception
+    they raised
+    """
+    from multiprocessing.pool import ThreadPool
+
+    targets = list(set(targets))
+    host_slots = {}
+    for target in targets:
+        host = urlparse.urlsplit(target[0]).netloc
+        host_slots.setdefault(host, threading.BoundedSemaphore(max_per_host))
+
+    def fetch_one(target):
+        with host_slots[urlparse.urlsplit(target[0]).netloc]:
+            try:
+                fetch(*target)
+            except errors as ex:
+                return target, ex
+        return target, None
+
+    pool = ThreadPool(max(1, min(max_workers, len(targets))))
+    try:
+        results = pool.map(fetch_one, targets)
+    finally:
+        pool.close()
+    return dict((target, ex) for target, ex in results if ex is not None)
+
+
+def prefetch_Packages_indexes(targets, cache=None, max_workers=8, max_per_host=4):
+    """
+    Download and parse all indexes an analysis needs concurrently,
+    over pooled keep-alive connections, and store them in C{cache} so
+    the following queries do not wait on the network one by one.
+    @param targets: iterable of (repo_url, os_platform, arch, source)
+    tuples, as passed to L{get_Packages_index}
+    @return: dict mapping the targets which failed to their L{BadRepo}
+    """
+    def fetch(repo_url, os_platform, arch, source):
+        get_Packages_index(repo_url, os_platform, arch, cache, source)
+    return fetch_concurrently(fetch, targets, max_workers, max_per_host)
+
+
+def _iter_Packages_fields(packagelist):
+    """
+    Generate (package, version, depends, distro, architecture) tuples
+    for every stanza of a Packages or Sources list.
+    @param packagelist: the list as a string or an iterable of lines
+    """
+    if isinstance(packagelist, basestring):
+        packagelist = StringIO(packagelist)
+    for fields in iter_stanzas(packagelist, fold_case=True):
+        if 'package' in fields and 'version' in fields:
+            yield (fields['package'], fields['version'],
+                   split_depends(fields.get('depends')),
+                   fields.get('wg-rosdistro'),
+                   fields.get('architecture'))
+
+
+def _iter_Packages(packagelist):
+    """
+    Generate (package, version, depends, distro) tuples for every
+    stanza of a Packages or Sources list.
+    @param packagelist: the list as a string or an iterable of lines
+    """
+    for fields in _iter_Packages_fields(packagelist):
+        yield fields[:4]
+
+
 def parse_Packages(packagelist):
     """
     Parse debian Packages list into (package, version, depends) tuples
+    @param packagelist: the list as a string or an iterable of lines
     @return: parsed tuples or None if packagelist is None
     """
-    package_deps = []
-    package = deps = version = distro = None
-    for l in packagelist.split('\n'):
-        if l.startswith('Package: '):
-            package = l[len('Package: '):]
-        elif l.startswith('Version: '):
-            version = l[len('Version: '):]
-        elif l.startswith('Depends: '):
-            deps = l[len('Depends: '):].split(',')
-            deps = [d.strip() for d in deps]
-        elif l.lower().startswith('wg-rosdistro: '):
-            distro = l[len('wg-rosdistro: '):]
-        if package != None and version != None and deps != None and distro != None:
-            package_deps.append((package, version, deps, distro))
-            package = version = deps = distro = None
-    return package_deps
+    return list(_iter_Packages(packagelist))
 
 
 def load_Packages(repo_url, os_platform, arch, cache=None, source=False):
@@ -155,60 +503,169 @@ def get_repo_version(repo_url, distro, os_platform, arch, source=False):
     """
     Return the greatest build-stamp for any deb in the repository
     """
-    packagelist = load_Packages(repo_url, os_platform, arch, source)
-    return max(['0'] + [x[1][x[1].find('-') + 1:x[1].find('~')] for x in packagelist if x[3] == distro.release_name])
+    summary = get_Packages_index(repo_url, os_platform, arch, source=source).summary
+    return newest_version(['0', summary.get_build_stamp(distro.release_name) or '0'])
 
 
 def count_packages(repo_url, rosdistro, os_platform, arch, cache=None):
-    packagelist = get_Packages(repo_url, os_platform, arch, cache)
-    M = re.findall('^Package: ros-%s-.*$' % (rosdistro), packagelist, re.MULTILINE)
-    return len(M)
+    return get_Packages_index(repo_url, os_platform, arch, cache).summary.count_packages(rosdistro)
 
 
-def deb_in_repo(repo_url, deb_name, deb_version, os_platform, arch, use_regex=True, cache=None, source=False):
+def get_arch_counts(repo_url, os_platform, arch, cache=None, source=False):
     """
-    @param cache: dictionary to store Packages list for caching
+    @return: dict mapping the Architecture field (e.g. 'amd64', 'all')
+    to the number of packages listed with it
+    """
+    return dict(get_Packages_index(repo_url, os_platform, arch, cache, source).summary.arch_counts)
+
+
+def get_mapped_index(repo_url, os_platform, arch, cache=None, source=False):
+    """
+    Retrieve a L{mapped_index.MappedIndex} of the package list, which
+    parses only the stanzas that are looked up.  It is stored in
+    C{cache}.
+    @raise BadRepo: if repo does not exist
     """
+    if cache is None:
+        cache = _Packages_cache
+
     if source:
-        packagelist = get_source_Packages(repo_url, os_platform, cache)
-        search_string = '^Package: %s\nFormat: .*\nBinary: .*\nArchitecture: .*\nVersion: %s' % (deb_name, deb_version)
-        M = re.search(search_string, packagelist, re.MULTILINE)
-        return M is not None
+        packages_url = _sources_url(repo_url, os_platform)
+        index_path, fallback_suffix = _SOURCES_PATH, '.gz'
     else:
-        packagelist = get_Packages(repo_url, os_platform, arch, cache)
-    if not use_regex:
-        s = 'Package: %s\nVersion: %s' % (deb_name, deb_version)
-        return s in packagelist
+        packages_url = _packages_url(repo_url, os_platform, arch)
+        index_path, fallback_suffix = _packages_path(arch), ''
+    key = ('mapped', packages_url)
+    if key not in cache:
+        path = _fetch_index_file(repo_url, os_platform, index_path, fallback_suffix)
+        cache[key] = mapped_index.MappedIndex(path)
+    return cache[key]
+
+
+def deb_in_repo(repo_url, deb_name, deb_version, os_platform, arch, use_regex=True, cache=None, source=False, mapped=False):
+    """
+    @param cache: dictionary to store Packages list for caching
+    @param mapped: look the package up through L{get_mapped_index}
+    unless the whole list is already parsed, for one-off checks which
+    do not need the whole list parsed.  Callers checking many packages
+    should share the parsed list instead.
+    """
+    if cache is None:
+        cache = _Packages_cache
+
+    packages_url = _sources_url(repo_url, os_platform) if source else _packages_url(repo_url, os_platform, arch)
+    if mapped and ('index', packages_url) not in cache and packages_url not in cache:
+        versions = get_mapped_index(repo_url, os_platform, arch, cache, source).versions(deb_name)
     else:
-        M = re.search('^Package: %s\nVersion: %s$' % (deb_name, deb_version), packagelist, re.MULTILINE)
-        return M is not None
+        versions = get_Packages_index(repo_url, os_platform, arch, cache, source).versions(deb_name)
+    # the source lookup has always matched a version prefix
+    return _match_versions(versions, deb_version, use_regex, full_match=not source)
+
+
+def find_missing(expected, index, full_match=True):
+    """
+    Check a whole set of expected packages against one index.
+    @param expected: dict or iterable of (name, version) pairs.  For a
+    L{PackagesIndex} the version is a regular expression, for a
+    L{yum_repo.RpmIndex} an rpm version, see their has_version().
+    @param index: a L{PackagesIndex} or L{yum_repo.RpmIndex}
+    @param full_match: passed on to has_version()
+    @return: set of the expected names which are absent from C{index}
+    or present in none of the expected versions
+    """
+    missing = set()
+    for name, version in dict(expected).iteritems():
+        if name not in index or not index.has_version(name, version, full_match=full_match):
+            missing.add(name)
+    return missing
+
+
+def compute_missing_matrix(expected, indexes, full_match=True):
+    """
+    Check a whole set of expected packages against many indexes, with
+    one pass over the expected set per index.
+    @param expected: dict or iterable of (name, version) pairs, see
+    L{find_missing}
+    @param indexes: dict mapping a label, e.g. (distro, arch), to an
+    index
+    @return: dict mapping each label to the set of missing names
+    """
+    expected = dict(expected)
+    return dict((label, find_missing(expected, index, full_match))
+                for label, index in indexes.iteritems())
+
+
+def _yum_url(repo_url, os_platform, arch):
+    # the layout of the fedora mirrors, with the source rpms in SRPMS
+    return repo_url + '/fedora/linux/%s/%s' % (os_platform, arch)
+
+
+def get_rpm_index(repo_url, os_platform, arch, cache=None, source=False):
+    """
+    Retrieve the parsed package list of a yum repository, see
+    L{yum_repo.load_rpm_index}.  The index is stored in C{cache}.
+    @raise BadRepo: if repo does not exist
+    """
+    if cache is None:
+        cache = _Packages_cache
+
+    url = _yum_url(repo_url, os_platform, 'SRPMS' if source else arch)
+    key = ('rpm_index', url)
+    if key not in cache:
+        try:
+            cache[key] = yum_repo.load_rpm_index(url)
+        except urllib2.HTTPError as ex:
+            raise BadRepo("[%s]: %s (HTTPError: %s)" % (repo_url, url, ex))
+        except urllib2.URLError as ex:
+            raise BadRepo("[%s]: %s (URLError %s)" % (repo_url, url, ex))
+        except Exception as ex:
+            raise BadRepo("[%s]: %s (%s)" % (repo_url, url, ex))
+    return cache[key]
+
+
+def prefetch_rpm_indexes(targets, cache=None, max_workers=8, max_per_host=4):
+    """
+    L{prefetch_Packages_indexes} for yum repositories.
+    @param targets: iterable of (repo_url, os_platform, arch, source)
+    tuples, as passed to L{get_rpm_index}
+    @return: dict mapping the targets which failed to their L{BadRepo}
+    """
+    def fetch(repo_url, os_platform, arch, source):
+        get_rpm_index(repo_url, os_platform, arch, cache, source)
+    return fetch_concurrently(fetch, targets, max_workers, max_per_host)
+
+
+def rpm_in_repo(repo_url, rpm_name, rpm_version, os_platform, arch, full_match=True, cache=None, source=False):
+    """
+    @param rpm_version: '[epoch:]version[-release]', compared by rpm
+    ordering and without dist tags, see L{yum_repo.RpmIndex.has_version}
+    @param full_match: require the whole release to match rather than
+    its leading segments
+    @param cache: dictionary to store the indexes for caching
+    """
+    index = get_rpm_index(repo_url, os_platform, arch, cache, source)
+    return index.has_version(rpm_name, rpm_version, full_match)
 
 
 def get_depends(repo_url, deb_name, os_platform, arch):
     """
-    Get all debian package dependencies by scraping the Packages
-    list. We mainly use this for invalidation logic.
+    Get all debian packages depending on C{deb_name} by scraping the
+    Packages list. We mainly use this for invalidation logic.
+    """
+    return list(get_dependents(repo_url, [deb_name], os_platform, arch))
+
+
+def get_dependents(repo_url, deb_names, os_platform, arch, cache=None):
+    """
+    Get all debian packages depending, directly or transitively, on
+    any of C{deb_names}.
+    @return: frozenset of package names
     """
     # There is probably something much simpler we could do, but this
     # more robust to any bad state we may have caused to the shadow
     # repo.
-    package_deps = load_Packages(repo_url, os_platform, arch)
-    queue = [deb_name]
-    depends = set()
-    # This is not particularly efficient, but it does not need to
-    # be. Basically, we find all the packages that depend on the
-    # package, then find all the packages that depends on those,
-    # etc...
-    while queue:
-        next_ = queue[0]
-        queue = queue[1:]
-        for package, _, deps, _ in package_deps:
-            #strip of version specifications from deps
-            deps = [d.split()[0] for d in deps]
-            if package not in depends and next_ in deps:
-                queue.append(package)
-                depends.add(package)
-    return list(depends)
+    index = get_Packages_index(repo_url, os_platform, arch, cache)
+    return index.get_dependents(deb_names)
 
 #def get_stack_version(packageslist, distro_name, stack_name):
 #    """
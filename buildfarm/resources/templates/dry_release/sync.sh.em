@@ -29,6 +29,10 @@ cd $WORKSPACE/buildfarm
 
 
 $WORKSPACE/buildfarm/scripts/count_ros_packages.py $DISTRO_NAME $OS_PLATFORM $ARCH --count $PACKAGES_FOR_SYNC
+# report what the sync will change in shadow-fixed, without blocking the
+# sync if the report fails
+$WORKSPACE/buildfarm/scripts/diff_repos.py $DISTRO_NAME $OS_PLATFORM $ARCH --verbose || true
+$WORKSPACE/buildfarm/scripts/diff_repos.py $DISTRO_NAME $OS_PLATFORM source || true
 ssh rosbuild@@pub8 -- PYTHONPATH=/home/rosbuild/reprepro_updater/src python /home/rosbuild/reprepro_updater/scripts/prepare_sync.py /var/packages/ros-shadow-fixed/ubuntu -r $DISTRO_NAME -d $OS_PLATFORM -a $ARCH -u http://50.28.27.175/repos/building/ -c
 # Sync source as well as binarys
 ssh rosbuild@@pub8 -- PYTHONPATH=/home/rosbuild/reprepro_updater/src python /home/rosbuild/reprepro_updater/scripts/prepare_sync.py /var/packages/ros-shadow-fixed/ubuntu -r $DISTRO_NAME -d $OS_PLATFORM -a source -u http://50.28.27.175/repos/building/ -c
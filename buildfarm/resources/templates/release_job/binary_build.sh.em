@@ -126,8 +126,5 @@ ssh rosbuild@@$ROS_REPO_FQDN -- rm -rf $UPLOAD_DIR/*
 scp -r $output_dir/*$distro* rosbuild@@$ROS_REPO_FQDN:$UPLOAD_DIR
 ssh rosbuild@@$ROS_REPO_FQDN -- PYTHONPATH=/home/rosbuild/reprepro_updater/src python /home/rosbuild/reprepro_updater/scripts/include_folder.py -d $distro -a $arch -f $UPLOAD_DIR -p $PACKAGE -c --delete --invalidate
 
-# update apt again
-sudo apt-get update -c $aptconffile -o Apt::Architecture=$arch @(ARCH == 'armel' ? "-o Apt::Architectures::=armel") @(ARCH == 'armhf' ? "-o Apt::Architectures::=armhf")
-
-# check that the uploaded successfully
-sudo $WORKSPACE/buildfarm/scripts/assert_package_present.py $rootdir $aptconffile  $PACKAGE
+# check the upload straight from the target repo's Packages list
+$WORKSPACE/buildfarm/scripts/assert_package_present.py $rootdir $aptconffile  $PACKAGE --repo $APT_TARGET_REPOSITORY --distro $distro --arch $arch
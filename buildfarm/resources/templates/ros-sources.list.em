@@ -1,3 +1,5 @@
 deb @(repo) @(distro) main
+@[if sources]@
 deb-src @(repo) @(distro) main
+@[end if]@
 
@@ -2,76 +2,218 @@
 
 from __future__ import print_function
 
+from contextlib import closing
 import csv
+import itertools
+import json
 import os
 import logging
 import re
+import tempfile
 import time
 import urllib2
 import yaml
 
 import apt
-import apt_pkg
 import numpy as np
 
+import buildfarm.apt_lists
 import buildfarm.apt_root
+from buildfarm.atomic_output import AtomicOutput
 from buildfarm.ros_distro import debianize_package_name,\
     undebianize_package_name
+from buildfarm.status_state import StatusState
+from buildfarm.string_table import StringTable
+from buildfarm.version import compare_debian_versions
 from rospkg.distro import distro_uri
 
 version_rx = re.compile(r'[0-9.-]+[0-9]')
 
+# size of the writes of the streamed HTML page
+HTML_BUFFER_SIZE = 64 * 1024
 
-class PackageVersion(object):
-    """
-    A class to store package versions.
-    """
-    def __init__(self, name, rosdistro):
-        self._name = name
-        self.debian_name = debianize_package_name(rosdistro, name)
-        self._versions = {}
+# the repos of the versions in each cell of the table, in order
+CELL_REPOS = ['building', 'shadow-fixed', 'ros/public']
 
-    def add_version(self, repo, distro_arch, version_string):
-        self._versions[(repo, distro_arch)] = version_string
+# the kinds of packages listed in the rosdistro, in table order
+DISTRO_TYPES = ['wet', 'variant', 'dry']
 
-    def get_version(self, repo, distro_arch):
-        if (repo, distro_arch) in self._versions:
-            return self._versions[(repo, distro_arch)]
-        else:
-            return None
+# state codes of the version of each repo in a cell, the low bits tell
+# how it compares with the rosdistro version of the row
+LATEST, OUTDATED, MISSING, OBSOLETE, IGNORE = range(5)
+STATE_MASK = 7
+# flags set on top of the state: the version is a regression against
+# the public repo, and syncing would change the public version of the
+# cell (set on every version of the cell)
+REGRESSION = 8
+SYNC_CHANGE = 16
 
-    def _pp_struct_(self):
-        return {'name': self._name,
-                'debian_name': self.debian_name,
-                'versions': self._versions}
+# css class and sort value of each state
+STATE_STYLES = {
+    LATEST: ('pkgLatest', '1&nbsp;green'),
+    OUTDATED: ('pkgOutdated', '3&nbsp;blue'),
+    MISSING: ('pkgMissing', '5&nbsp;red'),
+    OBSOLETE: ('pkgObsolete', '4&nbsp;yellow'),
+    IGNORE: ('pkgIgnore', '2&nbsp;gray'),
+}
 
 
 class VersionCache(object):
+    """
+    Versions of the packages of a rosdistro in each repo and distro
+    arch.
+
+    The versions are held in a dense matrix with a row per package and a
+    column per (repo, distro_arch), of ids into a table of the versions as
+    they are displayed, with their suffix already stripped.  Id 0 is the
+    missing version 'None', so the cells never filled stay missing.
+    """
+
     def __init__(self, rosdistro):
-        self._cache = {}
         self._rosdistro = rosdistro
+        self._names = []
+        self._debian_names = []
+        self._debian_ids = {}
+        self._package_ids = {}
+        self._column_ids = {}
+        self._versions = StringTable()
+        self._versions.get_id('None')
+        self._matrix = np.zeros((0, 0), dtype=np.int32)
+        # the rosdistro versions are not stripped:
+        # {'wet'|'variant'|'dry': {package id: version}}
+        self._distro_versions = dict((t, {}) for t in DISTRO_TYPES)
+        # versions of the ROS packages read from each (repo, distro_arch)
+        self._index_versions = {}
+        # fingerprints of the apt lists read for each (repo, distro_arch)
+        self.fingerprints = {}
         self._bootstrap_from_rosdistro(rosdistro)
-        self._primary_arch = None  # fill with the first used arch
+
+    def _get_package_id(self, name):
+        package_id = self._package_ids.get(name)
+        if package_id is None:
+            package_id = len(self._names)
+            self._package_ids[name] = package_id
+            self._names.append(name)
+            debian_name = debianize_package_name(self._rosdistro, name)
+            self._debian_ids.setdefault(debian_name, package_id)
+            self._debian_names.append(debian_name)
+        return package_id
+
+    def _get_column_id(self, repo, distro_arch):
+        column_id = self._column_ids.get((repo, distro_arch))
+        if column_id is None:
+            column_id = len(self._column_ids)
+            self._column_ids[(repo, distro_arch)] = column_id
+        return column_id
+
+    def _resize(self):
+        rows, columns = self._matrix.shape
+        if rows < len(self._names) or columns < len(self._column_ids):
+            # grow geometrically, packages may be added one at a time
+            matrix = np.zeros((max(len(self._names), 2 * rows),
+                               max(len(self._column_ids), 2 * columns)),
+                              dtype=np.int32)
+            matrix[:rows, :columns] = self._matrix
+            self._matrix = matrix
+
+    def _get_version_id(self, version_string):
+        return self._versions.get_id(strip_version_suffix(str(version_string)))
 
     def add(self, name, repo, distro_arch, version_string):
-        if name not in self._cache:
-            self._cache[name] = PackageVersion(name, self._rosdistro)
-        self._cache[name].add_version(repo, distro_arch, version_string)
+        package_id = self._get_package_id(name)
+        if repo == 'rosdistro':
+            self._distro_versions[distro_arch][package_id] = version_string
+            return
+        column_id = self._get_column_id(repo, distro_arch)
+        self._resize()
+        self._matrix[package_id, column_id] = \
+            self._get_version_id(version_string)
 
     def get_version(self, name, repo, distro_arch):
-        if not name in self._cache:
+        """
+        @return: the rosdistro version of the package for the
+        'rosdistro' repo, else its version with the suffix stripped, or
+        None
+        """
+        package_id = self._package_ids.get(name)
+        if package_id is None:
+            return None
+        if repo == 'rosdistro':
+            return self._distro_versions.get(distro_arch, {}).get(package_id)
+        column_id = self._column_ids.get((repo, distro_arch))
+        if column_id is None or package_id >= self._matrix.shape[0]:
             return None
-        return self._cache[name].get_version(repo, distro_arch)
+        version_id = self._matrix[package_id, column_id]
+        return self._versions[version_id] if version_id else None
+
+    def get_version_ids(self, names, columns):
+        """
+        @param columns: list of (repo, distro_arch)
+        @return: int32 array of the version ids of the packages C{names}
+        (rows) in C{columns}, 0 for the unknown packages and columns
+        """
+        self._resize()
+        rows = np.array([self._package_ids.get(n, -1) for n in names],
+                        dtype=np.intp)
+        cols = np.array([self._column_ids.get(c, -1) for c in columns],
+                        dtype=np.intp)
+        ids = np.zeros((len(rows), len(cols)), dtype=np.int32)
+        known_rows = np.flatnonzero(rows >= 0)
+        known_cols = np.flatnonzero(cols >= 0)
+        ids[np.ix_(known_rows, known_cols)] = \
+            self._matrix[np.ix_(rows[known_rows], cols[known_cols])]
+        return ids
+
+    def intern_versions(self, versions):
+        """
+        @param versions: displayed versions, e.g. of the cells of a
+        previous table, which are stored as they are
+        @return: int32 array of their ids, see L{get_version_strings}
+        """
+        return np.array([self._versions.get_id(v) for v in versions],
+                        dtype=np.int32)
+
+    def get_version_strings(self):
+        """
+        @return: object array mapping the version ids to the versions
+        """
+        return get_string_array(self._versions)
 
     def list_debian_names(self):
-        return [p.debian_name for p in self._cache.values()]
+        return list(self._debian_names)
+
+    def get_row_name(self, debian_name):
+        """
+        @return: the name of the row of the package C{debian_name} in
+        the table, the name of a rosdistro package or, as
+        L{make_versions_table} names the others, the undebianized name
+        """
+        package_id = self._debian_ids.get(debian_name)
+        if package_id is not None:
+            return self._names[package_id]
+        return undebianize_package_name(self._rosdistro, debian_name)
+
+    def get_index_versions(self):
+        """
+        @return: dict mapping each (repo, distro_arch) to a dict of the
+        debian names and versions of the packages found in it
+        """
+        return self._index_versions
 
     def pprint(self):
         import pprint
         pp = pprint.PrettyPrinter()
-        for k, v in self._cache.items():
-            print("%s:" % (k))
-            pp.pprint(v._pp_struct_())
+        for name in sorted(self._names):
+            versions = dict(((repo, da), self.get_version(name, repo, da))
+                            for repo, da in self._column_ids)
+            for t in DISTRO_TYPES:
+                versions[('rosdistro', t)] = \
+                    self.get_version(name, 'rosdistro', t)
+            print("%s:" % (name))
+            pp.pprint({'name': name,
+                       'debian_name': self._debian_names[
+                           self._package_ids[name]],
+                       'versions': versions})
 
     def _bootstrap_from_rosdistro(self, rosdistro):
         if rosdistro == 'fuerte':
@@ -97,33 +239,25 @@ class VersionCache(object):
             name = variant.keys()[0]
             self.add(name, 'rosdistro', 'variant', '1.0.0')
 
-    def fill_debian_versions(self, rootdir, repo, distro, arch):
+    def add_debian_versions(self, repo, distro_arch, versions):
         """
-        Call this after populating the rosdistro names, and it will
-        try to fill in the debian versions.
+        @param versions: dict mapping debian package names to versions
         """
-        distro_arch = "%s_%s" % (distro, arch)
-        if not self._primary_arch:
-            self._primary_arch = arch
-
-        logging.debug("building Cache")
-        aptcache = get_apt_cache(get_repo_cache_dir_name(rootdir,
-                                                         repo,
-                                                         distro_arch))
-        logging.debug("iterating cache length %d" % len(self._cache))
-
-        for p in self._cache.values():
-            # only detect source for one arch
-            if self._primary_arch == arch:
-                self.add(p._name, repo, distro + "_source",
-                         detect_source_version(p.debian_name))
-
-            # look for binaries
-            if p.debian_name in aptcache:
-                apt_p = aptcache[p.debian_name]
-                version_obj = getattr(apt_p, 'candidate', None)
-                version = getattr(version_obj, 'version', None)
-                self.add(p._name, repo, distro_arch, version)
+        self._index_versions[(repo, distro_arch)] = dict(
+            (name, v) for name, v in versions.iteritems() if v is not None)
+        rows = [package_id
+                for package_id, debian_name in enumerate(self._debian_names)
+                if debian_name in versions]
+        column_id = self._get_column_id(repo, distro_arch)
+        self._resize()
+        # each distinct version is stripped and interned once
+        version_ids = {}
+        for v in versions.itervalues():
+            if v not in version_ids:
+                version_ids[v] = self._get_version_id(v)
+        self._matrix[rows, column_id] = [
+            version_ids[versions[self._debian_names[package_id]]]
+            for package_id in rows]
 
     def get_distro_versions(self):
         """
@@ -131,16 +265,11 @@ class VersionCache(object):
         return np.array( ( name, version, wet == True), ... ])
         """
         output = []
-        for p in self._cache.values():
-            version = p.get_version('rosdistro', 'wet')
-            if version:
-                output.append((p._name, version, 'wet'))
-            version = p.get_version('rosdistro', 'variant')
-            if version:
-                output.append((p._name, version, 'variant'))
-            version = p.get_version('rosdistro', 'dry')
-            if version:
-                output.append((p._name, version, 'dry'))
+        for package_id, name in enumerate(self._names):
+            for t in DISTRO_TYPES:
+                version = self._distro_versions[t].get(package_id)
+                if version:
+                    output.append((name, version, t))
         return np.array(output)
 
 
@@ -157,10 +286,19 @@ def get_repo_da_caches(rootdir, ros_repo_names, da_strs):
             for da_str in da_strs]
 
 
-def get_apt_cache(dirname):
-    c = apt.Cache(rootdir=dirname)
-    c.open()
-    return c
+def read_source_versions(cache_dir, debian_names, repo_url=None, prefix=''):
+    """
+    Index the source packages of an apt rootdir in one pass over its
+    Sources lists.
+    @param repo_url: only read the lists of this repository
+    @param prefix: only index source packages whose name starts with it
+    @return: dict mapping each of C{debian_names} to the version of its
+    source package, or None
+    """
+    sources = buildfarm.apt_lists.read_versions(
+        buildfarm.apt_lists.find_lists(cache_dir, repo_url, '_Sources'), prefix)
+    return dict((name, strip_version_suffix(sources[name]) if name in sources else None)
+                for name in debian_names)
 
 
 def get_ros_repo_names(ros_repos):
@@ -188,61 +326,253 @@ def get_distro_arches(arches, rosdistro):
     return [(d, a) for d in distros for a in arches]
 
 
+def get_table_header(da_strs):
+    return ['name', 'version', 'wet'] + list(da_strs)
+
+
+class VersionTable(object):
+    """
+    The table the status page shows: a row per package with its name,
+    rosdistro version and type, and for each column (a distro_arch or
+    distro_source) the ids of its version in each repo.
+    """
+
+    def __init__(self, names, versions, types, columns, repo_names,
+                 version_ids, version_strings, codes=None):
+        """
+        @param names, versions, types: object arrays, one entry per row
+        @param columns: the distro_arch and distro_source columns
+        @param version_ids: int array of shape (rows, columns, repos)
+        @param version_strings: object array mapping the version ids to
+        the displayed versions, id 0 being 'None'
+        @param codes: the state codes of the versions, computed by
+        L{classify_versions} if None
+        """
+        self.names = names
+        self.versions = versions
+        self.types = types
+        self.columns = list(columns)
+        self.repo_names = list(repo_names)
+        self.version_ids = version_ids
+        self.version_strings = version_strings
+        self.codes = classify_versions(self) if codes is None else codes
+
+    def __len__(self):
+        return len(self.names)
+
+    def get_header(self):
+        return get_table_header(self.columns)
+
+    def get_cells(self):
+        """
+        @return: object array of shape (rows, columns) of the 'a|b|c'
+        cells joining the version of each repo
+        """
+        versions = self.version_strings[self.version_ids]
+        cells = versions[:, :, 0]
+        for k in range(1, versions.shape[2]):
+            cells = cells + '|' + versions[:, :, k]
+        return cells
+
+    def get_source_columns(self):
+        return np.array([c.endswith('_source') for c in self.columns],
+                        dtype=bool)
+
+    def get_no_source_rows(self):
+        """
+        @return: bool array of the dry stack and variant rows, which
+        have no source packages
+        """
+        return np.array([t in ['variant', 'dry'] for t in self.types],
+                        dtype=bool)
+
+    def count_versions(self):
+        """
+        @return: int array of shape (columns, repos) counting the rows
+        with a version in each repo of each column
+        """
+        states = self.codes & STATE_MASK
+        return ((states != MISSING) & (states != IGNORE)).sum(axis=0)
+
+    def get_row_diffs(self):
+        """
+        @return: bool array flagging the rows whose cells are not the
+        same in all columns, ignoring the source columns of the rows
+        without source packages
+        """
+        rows, columns, repos = self.version_ids.shape
+        if not rows or not columns:
+            return np.zeros(rows, dtype=bool)
+        compared = np.ones((rows, columns), dtype=bool)
+        compared[np.ix_(self.get_no_source_rows(),
+                        self.get_source_columns())] = False
+        # compare every cell with the first compared cell of its row
+        first = compared.argmax(axis=1)
+        reference = self.version_ids[np.arange(rows), first]
+        differs = (self.version_ids != reference[:, None, :]).any(axis=2)
+        return (differs & compared).any(axis=1)
+
+    def get_rows(self):
+        """
+        @return: list of the rows of the table as lists of strings, in
+        the order of L{get_header}
+        """
+        cells = self.get_cells().tolist()
+        return [[name, version, t] + row_cells
+                for name, version, t, row_cells in
+                zip(self.names, self.versions, self.types, cells)]
+
+
+def _map_pairs(first_ids, second_ids, function):
+    """
+    Apply C{function} to each distinct pair of ids of two arrays of the
+    same shape.
+    @return: array of the results, of the shape of the arrays
+    """
+    if not first_ids.size:
+        return np.zeros(first_ids.shape, dtype=bool)
+    n = int(second_ids.max()) + 1
+    pairs = first_ids.astype(np.int64) * n + second_ids
+    unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+    results = np.array([function(int(p) // n, int(p) % n)
+                        for p in unique_pairs])
+    return results[inverse].reshape(first_ids.shape)
+
+
+def classify_versions(table):
+    """
+    Compute the state code of every version of a L{VersionTable} with a
+    few array operations: each distinct pair of versions is only
+    compared once.
+    @return: uint8 array of the shape of C{table.version_ids}
+    """
+    ids = table.version_ids
+    strings = table.version_strings
+    rows, columns, repos = ids.shape
+
+    # rows without rosdistro version and the source columns of dry
+    # stacks and variants expect no package
+    expected = np.array([bool(v) for v in table.versions], dtype=bool)
+    expected = np.repeat(expected[:, None], columns, axis=1)
+    expected[np.ix_(table.get_no_source_rows(),
+                     table.get_source_columns())] = False
+
+    latest = StringTable()
+    latest_ids = np.array([latest.get_id(v) for v in table.versions],
+                          dtype=np.int32)
+    same = _map_pairs(
+        ids, np.repeat(np.repeat(latest_ids[:, None, None], columns, axis=1),
+                       repos, axis=2),
+        lambda i, j: is_same_version(strings[i], latest[j]))
+    present = ids != 0
+    codes = np.where(expected[:, :, None],
+                     np.where(present, np.where(same, LATEST, OUTDATED),
+                              MISSING),
+                     np.where(present, OBSOLETE, IGNORE)).astype(np.uint8)
+
+    if repos > 1:
+        public = np.repeat(ids[:, :, -1:], repos - 1, axis=2)
+        regression = _map_pairs(
+            ids[:, :, :-1], public,
+            lambda i, j: is_regression(strings[i], strings[j]))
+        codes[:, :, :-1] |= np.where(regression, REGRESSION,
+                                     0).astype(np.uint8)
+        codes[ids[:, :, -2] != ids[:, :, -1]] |= SYNC_CHANGE
+    return codes
+
+
+def get_string_array(string_table):
+    """
+    @return: object array mapping the ids of a L{StringTable} to its
+    strings
+    """
+    return np.array([string_table[i] for i in range(len(string_table))],
+                    dtype=object)
+
+
+def read_csv_table(data_source):
+    """
+    Read the table of a .csv file written by L{write_csv}, splitting
+    each cell once.
+    @rtype: L{VersionTable}
+    """
+    reader = csv.reader(data_source, delimiter=',', quotechar='"')
+    header = next(reader)
+    rows = [row for row in reader]
+
+    versions = StringTable()
+    versions.get_id('None')
+    version_ids = np.array(
+        [[[versions.get_id(v) for v in get_cell_versions(cell)]
+          for cell in row[3:]] for row in rows],
+        dtype=np.int32).reshape(len(rows), len(header) - 3, len(CELL_REPOS))
+    return VersionTable(np.array([row[0] for row in rows], dtype=object),
+                        np.array([row[1] for row in rows], dtype=object),
+                        np.array([row[2] for row in rows], dtype=object),
+                        header[3:], CELL_REPOS, version_ids,
+                        get_string_array(versions))
+
+
 def make_versions_table(version_cache, ros_pkgs_table, repo_name_da_to_pkgs,
-                        da_strs, repo_names, rosdistro):
+                        da_strs, repo_names, rosdistro,
+                        previous_rows=None, changed_names=()):
     '''
     Returns an in-memory table with all the information that will be displayed:
     ros package names and versions followed by debian versions for each
     distro/arch.
-    '''
-    left_columns = [('name', object), ('version', object), ('wet', object)]
-    right_columns = [(da_str, object) for da_str in da_strs]
-    columns = left_columns + right_columns
 
+    The cells of a row found in C{previous_rows}, a table with the same
+    columns keyed by L{get_row_key}, are reused unless the package is in
+    C{changed_names} or its rosdistro version changed.
+    @rtype: L{VersionTable}
+    '''
     debian_names = version_cache.list_debian_names()
 
     non_ros_pkg_names = set([])
     ros_pkg_names = set(debian_names)
-    for pkgs in repo_name_da_to_pkgs.values():
-        pkg_names = set([pkg.name for pkg in pkgs])
-        non_ros_pkg_names |= pkg_names - ros_pkg_names
-
-    table = np.empty(len(ros_pkgs_table) + len(non_ros_pkg_names),
-                     dtype=columns)
-
-    for i, (name, version, wet) in enumerate(ros_pkgs_table):
-        table['name'][i] = name
-        table['version'][i] = version
-        table['wet'][i] = wet
-        for da_str in da_strs:
-            table[da_str][i] = add_version_cell(version_cache,
-                                                name,
-                                                repo_names,
-                                                da_str)
-
-    i = len(ros_pkgs_table)
-    for pkg_name in non_ros_pkg_names:
-        undebianized_pkg_name = undebianize_package_name(rosdistro, pkg_name)
-        table['name'][i] = undebianized_pkg_name
-        table['version'][i] = ''
-        table['wet'][i] = 'unknown'
-        for da_str in da_strs:
-            table[da_str][i] = add_version_cell(version_cache,
-                                                undebianized_pkg_name,
-                                                repo_names, da_str)
-        i += 1
-
-    return table
-
-
-def add_version_cell(version_cache, pkg_name, repo_names, da_str):
-    versions = []
-    for repo_name in repo_names:
-        v = version_cache.get_version(pkg_name, repo_name, da_str)
-        v = str(v)
-        v = strip_version_suffix(v)
-        versions.append(v)
-    return '|'.join(versions)
+    for pkg_names in repo_name_da_to_pkgs.values():
+        non_ros_pkg_names |= set(pkg_names) - ros_pkg_names
+
+    names = [str(name) for name, _, _ in ros_pkgs_table] + \
+        [undebianize_package_name(rosdistro, pkg_name)
+         for pkg_name in non_ros_pkg_names]
+    versions = [str(version) for _, version, _ in ros_pkgs_table] + \
+        [''] * len(non_ros_pkg_names)
+    types = [str(wet) for _, _, wet in ros_pkgs_table] + \
+        ['unknown'] * len(non_ros_pkg_names)
+
+    version_ids = np.zeros((len(names), len(da_strs), len(repo_names)),
+                           dtype=np.int32)
+    previous_rows = previous_rows or {}
+    reused, reused_cells = [], []
+    for i, key in enumerate(zip(names, types)):
+        previous = previous_rows.get(key)
+        if previous is None or previous[1] != versions[i] or \
+                key[0] in changed_names:
+            continue
+        cells = [cell.split('|') for cell in previous[3:]]
+        if all(len(cell) == len(repo_names) for cell in cells):
+            reused.append(i)
+            reused_cells.extend(itertools.chain.from_iterable(cells))
+    if reused:
+        version_ids[reused] = version_cache.intern_versions(
+            reused_cells).reshape(len(reused), len(da_strs), len(repo_names))
+
+    # one gather from the version matrix for the cells of the other rows
+    built = np.setdiff1d(np.arange(len(names)), reused)
+    columns = [(repo_name, da_str)
+               for da_str in da_strs for repo_name in repo_names]
+    version_ids[built] = version_cache.get_version_ids(
+        [names[i] for i in built], columns).reshape(
+            len(built), len(da_strs), len(repo_names))
+    logging.info('Reused %d rows of the previous table, built %d',
+                 len(reused), len(built))
+
+    return VersionTable(np.array(names, dtype=object),
+                        np.array(versions, dtype=object),
+                        np.array(types, dtype=object),
+                        da_strs, repo_names, version_ids,
+                        version_cache.get_version_strings())
 
 
 def strip_version_suffix(version):
@@ -262,22 +592,6 @@ def strip_version_suffix(version):
     return match.group(0) if match else version
 
 
-def detect_source_version(source_name):
-    """
-    Detect if the source package is available on the server and return
-    the version, else None
-    """
-    src = apt_pkg.SourceRecords()
-    source_lookup = src.lookup(source_name)
-    if not source_lookup:
-        #print("Missed %s" % source_name)
-        return None
-    else:
-        src_version = strip_version_suffix(src.version)
-        #print("Source %s %s" % (source_name, src_version))
-        return src_version
-
-
 def get_dist_arch_str(d, a):
     return "%s_%s" % (d, a)
 
@@ -287,45 +601,119 @@ def get_repo_cache_dir_name(rootdir, ros_repo_name, dist_arch):
 
 
 def build_repo_cache(dir_, ros_repo_name, ros_repo_url,
-                     distro, arch, update=True):
+                     distro, arch, update=True, sources=True):
+    """
+    Set up a rootdir with only the ROS repository configured, its lists
+    are read with L{read_list_versions}.
+    @param update: download the lists of the repository
+    @param sources: also fetch the Sources lists of the repository
+    """
     logging.debug('Setting up an apt directory at %s', dir_)
     repo_dict = {ros_repo_name: ros_repo_url}
     buildfarm.apt_root.setup_apt_rootdir(dir_, distro, arch,
-                                         additional_repos=repo_dict)
-    logging.info('Getting a list of packages for %s-%s', distro, arch)
-    cache = apt.Cache(rootdir=dir_)
-    cache.open()
+                                         additional_repos=repo_dict,
+                                         ros_only=True,
+                                         sources=sources)
     if update:
-        cache.update()
-        # Have to open the cache again after updating.
-        cache.open()
+        logging.info('Getting a list of packages for %s-%s', distro, arch)
+        apt.Cache(rootdir=dir_).update()
+
+
+def read_list_versions(cache_dir, repo_url, prefix):
+    """
+    Read versions from the Packages lists of C{repo_url} in an apt
+    rootdir, without opening an apt cache.
+    @return: dict mapping the names starting with C{prefix} to their
+    candidate version
+    """
+    return buildfarm.apt_lists.read_versions(
+        buildfarm.apt_lists.find_lists(cache_dir, repo_url), prefix)
 
 
-def get_pkgs_from_apt_cache(cache_dir, substring):
-    cache = apt.Cache(rootdir=cache_dir)
-    cache.open()
-    return [cache[name] for name in cache.keys() if name.startswith(substring)]
+def _read_repo_versions(job):
+    """
+    Set up and update the apt rootdir of one repo and distro arch and
+    read its versions.  This runs in a pool of processes, as apt caches
+    cannot be shared between threads, and only returns the versions of
+    the requested packages.
+    @return: (repo, distro, arch, {debian name: binary version},
+    fingerprint of the Packages lists, {debian name: source version}
+    or None, fingerprint of the Sources lists or None)
+    """
+    rootdir, repo, repo_url, distro, arch, update, prefix, debian_names, \
+        detect_source = job
+    da_str = "%s_%s" % (distro, arch)
+    cache_dir = get_repo_cache_dir_name(rootdir, repo, da_str)
+    # the Sources lists are only read for the primary arch
+    build_repo_cache(cache_dir, repo, repo_url, distro, arch, update,
+                     sources=detect_source)
+    logging.debug("Filling debian version for %s %s", repo, da_str)
+    list_versions = read_list_versions(cache_dir, repo_url, prefix)
+    binary_versions = dict((name, list_versions[name])
+                           for name in debian_names if name in list_versions)
+    binary_fingerprint = buildfarm.apt_lists.get_fingerprint(
+        cache_dir, repo_url, ['_Packages'])
+    source_versions = source_fingerprint = None
+    if detect_source:
+        source_versions = read_source_versions(cache_dir, debian_names,
+                                               repo_url, prefix)
+        # the source column only changes with the Sources lists
+        source_fingerprint = buildfarm.apt_lists.get_fingerprint(
+            cache_dir, repo_url, ['_Sources'])
+    return repo, distro, arch, binary_versions, binary_fingerprint, \
+        source_versions, source_fingerprint
 
 
 def build_version_cache(rootdir, rosdistro, distro_arches,
-                        ros_repos, update=True):
+                        ros_repos, update=True, jobs=None):
+    """
+    @param jobs: number of processes building apt caches in parallel,
+    the number of cpus if None
+    """
+    import multiprocessing
+
     version_cache = VersionCache(rosdistro)
-    for repo in ros_repos:
-        for (d, a) in distro_arches:
-            da_str = "%s_%s" % (d, a)
-            build_repo_cache(get_repo_cache_dir_name(rootdir,
-                                                     repo, da_str),
-                             repo,
-                             ros_repos[repo],
-                             d, a, update)
-            logging.debug("Filling debian version for %s %s", repo, da_str)
-            version_cache.fill_debian_versions(rootdir, repo, d, a)
+    if not distro_arches:
+        return version_cache
+    debian_names = version_cache.list_debian_names()
+    # the source versions are only detected for one arch
+    primary_arch = distro_arches[0][1]
+    work = [(rootdir, repo, ros_repos[repo], d, a, update,
+             'ros-%s-' % rosdistro, debian_names, a == primary_arch)
+            for repo in ros_repos for (d, a) in distro_arches]
+
+    # a fresh process per target releases each apt cache when it is done
+    pool = multiprocessing.Pool(jobs, maxtasksperchild=1)
+    try:
+        results = pool.map(_read_repo_versions, work, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    for repo, d, a, binary_versions, binary_fingerprint, \
+            source_versions, source_fingerprint in results:
+        if source_versions is not None:
+            version_cache.add_debian_versions(repo, d + "_source",
+                                              source_versions)
+            version_cache.fingerprints[(repo, d + "_source")] = \
+                source_fingerprint
+        version_cache.add_debian_versions(repo, "%s_%s" % (d, a),
+                                          binary_versions)
+        version_cache.fingerprints[(repo, "%s_%s" % (d, a))] = \
+            binary_fingerprint
 
     return version_cache
 
 
-def render_csv(version_cache, rootdir, outfile, rosdistro,
-               distro_arches, ros_repos):
+def make_status_table(version_cache, rootdir, rosdistro,
+                      distro_arches, ros_repos, previous_state=None,
+                      changed_names=None):
+    """
+    @param previous_state: L{StatusState} of the previous run, whose
+    rows are reused unless the package is in C{changed_names}, see
+    L{StatusState.get_changed_names}
+    @rtype: L{VersionTable}
+    """
     distros = {}
 
     for (d, a) in distro_arches:
@@ -342,57 +730,192 @@ def render_csv(version_cache, rootdir, outfile, rosdistro,
 
     ros_pkgs_table = version_cache.get_distro_versions()
 
-    # Get the version of each Debian package in each ROS apt repository.
+    # Get the Debian packages in each ROS apt repository.
     repo_name_da_to_pkgs = dict(((repo_name, da_str),
-                                 get_pkgs_from_apt_cache(cache, 'ros-%s-' % \
-                                                             rosdistro))
+                                 read_list_versions(cache, ros_repos[repo_name],
+                                                    'ros-%s-' % rosdistro).keys())
                                 for repo_name, da_str, cache in repo_da_caches)
 
+    previous_rows = None
+    if previous_state is not None and changed_names is not None and \
+            previous_state.header == get_table_header(da_strs):
+        previous_rows = previous_state.rows
+
     # Make an in-memory table showing the latest deb version for each package.
     t = make_versions_table(version_cache,
                             ros_pkgs_table,
                             repo_name_da_to_pkgs,
                             da_strs,
                             ros_repos.keys(),
-                            rosdistro)
+                            rosdistro,
+                            previous_rows,
+                            changed_names)
+    return t
+
+
+def make_status_state(table, version_cache):
+    """
+    @return: L{StatusState} of the run which built C{table}
+    """
+    return StatusState(table.get_header(), table.get_rows(),
+                       dict(version_cache.fingerprints),
+                       dict(version_cache.get_index_versions()))
 
-    with open(outfile, 'w') as fh:
+
+def write_csv(table, outfile):
+    """
+    Write the table to C{outfile} and C{outfile}.gz atomically.
+    @return: sha256 of the .csv file
+    """
+    with AtomicOutput(outfile) as fh:
         # Output CSV from the in-memory table
         w = csv.writer(fh)
-        w.writerow(t.dtype.names)
-        for row in t:
-            w.writerow(row)
+        w.writerow(table.get_header())
+        w.writerows(table.get_rows())
+    return fh.sha256
 
 
-def transform_csv_to_html(data_source, metadata_builder,
-                          rosdistro, start_time):
-    reader = csv.reader(data_source, delimiter=',', quotechar='"')
-    rows = [row for row in reader]
+def _to_bytes_array(values):
+    # fixed width strings are stored without pickling
+    return np.array(list(values), dtype=str)
 
-    header = rows[0]
-    rows = rows[1:]
 
-    html_head = make_html_head(rosdistro, start_time)
+def save_table_snapshot(table, path):
+    """
+    Save a table in numpy's binary .npz format, so that it can be
+    rendered again without building it or parsing a .csv file.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, 'wb') as f:
+        np.savez_compressed(f,
+                            names=_to_bytes_array(table.names),
+                            versions=_to_bytes_array(table.versions),
+                            types=_to_bytes_array(table.types),
+                            columns=_to_bytes_array(table.columns),
+                            repo_names=_to_bytes_array(table.repo_names),
+                            version_ids=table.version_ids,
+                            version_strings=_to_bytes_array(
+                                table.version_strings),
+                            codes=table.codes)
+    os.rename(tmp_path, path)
+
+
+def load_table_snapshot(path):
+    """
+    @return: the L{VersionTable} saved by L{save_table_snapshot}
+    """
+    with closing(np.load(path)) as data:
+        return VersionTable(data['names'].astype(object),
+                            data['versions'].astype(object),
+                            data['types'].astype(object),
+                            data['columns'].tolist(),
+                            data['repo_names'].tolist(),
+                            data['version_ids'],
+                            data['version_strings'].astype(object),
+                            data['codes'])
+
+
+def make_json(table, rosdistro=None, start_time=None):
+    """
+    @return: compact JSON feed of the table.  Its 'versions' list maps
+    the version ids to the versions and each of its 'rows' is [name,
+    rosdistro version, type, 1 if the cells differ between the columns
+    else 0, version ids, state codes], the ids and codes listing the
+    repos of each column in turn
+    """
+    rows, columns, repos = table.version_ids.shape
+    version_ids = table.version_ids.reshape(rows, columns * repos).tolist()
+    codes = table.codes.reshape(rows, columns * repos).tolist()
+    row_diffs = table.get_row_diffs().astype(int).tolist()
+    feed = {
+        'rosdistro': rosdistro,
+        'generated': time.strftime('%Y-%m-%d %H:%M:%S %Z', start_time)
+                     if start_time else None,
+        'columns': table.columns,
+        'repos': table.repo_names,
+        'states': dict((name, code) for name, code in [
+            ('latest', LATEST), ('outdated', OUTDATED),
+            ('missing', MISSING), ('obsolete', OBSOLETE),
+            ('ignore', IGNORE)]),
+        'flags': {'mask': STATE_MASK,
+                  'regression': REGRESSION,
+                  'sync': SYNC_CHANGE},
+        'versions': table.version_strings.tolist(),
+        'rows': [[table.names[i], table.versions[i], table.types[i],
+                  row_diffs[i], version_ids[i], codes[i]]
+                 for i in range(rows)],
+    }
+    return json.dumps(feed, separators=(',', ':'))
+
+
+def write_json(table, path, rosdistro=None, start_time=None):
+    """
+    Write the JSON feed of the table to C{path} and gzip compressed to
+    C{path}.gz, for web servers to send as is, both atomically.
+    @return: sha256 of the feed
+    """
+    with AtomicOutput(path) as f:
+        f.write(make_json(table, rosdistro, start_time))
+    return f.sha256
+
+
+def write_html(table, metadata_builder, rosdistro, start_time, f,
+               feed_url=None, buffer_size=HTML_BUFFER_SIZE):
+    write_chunks(iter_html(table, metadata_builder, rosdistro, start_time,
+                           feed_url),
+                 f, buffer_size)
 
-    metadata_columns = [None] * 3 + [metadata_builder(c) for c in header[3:]]
+
+def write_chunks(chunks, f, buffer_size=HTML_BUFFER_SIZE):
+    """
+    Write the strings generated by C{chunks} to C{f}, joined into writes
+    of about C{buffer_size} bytes.
+    """
+    buf = []
+    size = 0
+    for chunk in chunks:
+        buf.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            f.write(''.join(buf))
+            buf = []
+            size = 0
+    if buf:
+        f.write(''.join(buf))
+
+
+def iter_html(table, metadata_builder, rosdistro, start_time,
+              feed_url=None):
+    """
+    Generate the HTML page of a L{VersionTable} piece by piece, each row
+    being formatted only when it is reached.
+    @param feed_url: url of the JSON feed of the table, see
+    L{make_html_head}; the page then has no rows of its own
+    """
+    metadata_columns = [None] * 3 + [metadata_builder(c) for c in table.columns]
+    html_head = make_html_head(rosdistro, start_time,
+                               len(table.columns) + 3, feed_url,
+                               metadata_columns)
+    header = table.get_header()
     header = [format_header_cell(header[i],
                                  metadata_columns[i]) \
                   for i in range(len(header))]
 
     # count non-None rows per (sub-)column
-    counts = [[]] * 3 + [[0] * 3 for _ in range(3, len(header))]
-    for row in rows:
-        for i in range(3, len(counts)):
-            versions = get_cell_versions(row[i])
-            for j in range(0, len(versions)):
-                if versions[j] != 'None':
-                    counts[i][j] += 1
+    counts = [[]] * 3 + table.count_versions().tolist()
 
-    rows = [format_row(r, metadata_columns) for r in rows]
-    body = make_html_legend()
-    body += make_html_table(header, counts, rows)
+    source_columns = table.get_source_columns().tolist()
+    row_diffs = table.get_row_diffs().tolist()
+    rows = (format_row([table.names[i], table.versions[i], table.types[i]],
+                       table.version_strings[table.version_ids[i]].tolist(),
+                       table.codes[i].tolist(), row_diffs[i],
+                       metadata_columns, source_columns)
+            for i in range(len(table) if feed_url is None else 0))
+    body = itertools.chain([make_html_legend()],
+                           iter_html_table(header, counts, rows))
 
-    return make_html_doc(html_head, body)
+    return iter_html_doc(html_head, body)
 
 
 def format_header_cell(cell, metadata):
@@ -403,95 +926,128 @@ def format_header_cell(cell, metadata):
     return cell
 
 
-def format_row(row, metadata_columns):
-    latest_version = row[1]
-    public_changing_on_sync = [False] * 3 + \
-        [is_public_changing_on_sync(c) for c in row[3:]]
-    # Flag if this is dry or a variant so as not to show sourcedebs as red
-    no_source = row[2] in ['variant', 'dry']
-    # ignore source columns for dry/variant when deciding of columns are homogeneous
-    diff_columns = [c for i, c in enumerate(row) if i > 2 and (not no_source or i % 3)]
-    has_diff_between_rosdistros = len(set(diff_columns)) > 1
-
+def format_row(row, versions, codes, has_diff, metadata_columns,
+               source_columns):
+    """
+    @param row: name, rosdistro version and type of the row
+    @param versions: the versions of each repo per column
+    @param codes: the state codes of L{versions}
+    @param has_diff: whether the cells differ between the columns
+    @param source_columns: whether each column is a source column
+    """
     # urls for each building repository column
-    metadata = [None] * 3 + [md for md in metadata_columns[3:]]
+    metadata = metadata_columns[3:]
     if row[2] == 'dry':
         # disable links for dry source columns
-        metadata = [(c if i < 3 or i % 3 else None) for i, c in enumerate(metadata)]
+        metadata = [(None if is_source else c)
+                    for c, is_source in zip(metadata, source_columns)]
     elif row[2] in ['unknown', 'variant']:
         # disable all links for unknown and variant rows
         metadata = [None for _ in range(len(metadata))]
     job_urls = [md['job_url'].format(pkg=row[0].replace('_', '-')) \
                     if md else None for md in metadata]
-    # only pass no_source if this is a sourcedeb entry
-    row = row[:3] + [format_versions_cell(row[i],
-                                          latest_version,
-                                          job_urls[i],
-                                          public_changing_on_sync[i],
-                                          no_source and i % 3 == 0) \
-                         for i in range(3, len(row))]
-    if has_diff_between_rosdistros:
+    row = row[:3] + [format_versions_cell(v, c, url)
+                     for v, c, url in zip(versions, codes, job_urls)]
+    if has_diff:
         row[0] += ' <span class="hiddentext">diff</span>'
 
     return row
 
 
-def is_public_changing_on_sync(cell):
+def get_cell_regressions(cell):
+    """
+    @return: set of the repos whose version in C{cell} is a regression
+    against the public repo
+    """
     versions = get_cell_versions(cell)
-    return versions[1] != versions[2]
+    return set(repo for repo, v in zip(CELL_REPOS, versions[:-1])
+               if is_regression(v, versions[-1]))
+
+
+def get_status_changes(previous_state, state, changed_names=None):
+    """
+    Compare the tables of two runs of the status page.
+    @param changed_names: the names of the packages whose versions
+    changed in any index, see L{StatusState.get_changed_names}; the
+    cells of the other rows are not compared if their rosdistro version
+    and the columns did not change
+    @return: sorted list of (name, type, column, change, repo) for the
+    rows which were 'added' or 'removed', with column and repo None, and
+    for the 'regression' and 'fixed' changes of each repo of a cell
+    """
+    changes = [key + (None, 'removed', None)
+               for key in previous_state.rows if key not in state.rows]
+    previous_columns = dict((c, i) for i, c in enumerate(previous_state.header))
+    same_columns = previous_state.header == state.header
+    for key, row in state.rows.iteritems():
+        previous = previous_state.rows.get(key)
+        if previous is None:
+            changes.append(key + (None, 'added', None))
+        elif changed_names is not None and same_columns and \
+                key[0] not in changed_names and previous[1] == row[1]:
+            continue
+        for i, column in enumerate(state.header[3:], 3):
+            old = set()
+            if previous is not None and column in previous_columns:
+                old = get_cell_regressions(previous[previous_columns[column]])
+            new = get_cell_regressions(row[i])
+            changes.extend(key + (column, 'regression', repo)
+                           for repo in new - old)
+            changes.extend(key + (column, 'fixed', repo)
+                           for repo in old - new)
+    return sorted(changes)
 
 
 def get_cell_versions(cell):
     return cell.split('|')
 
 
-def format_versions_cell(cell, latest_version, url=None,
-                         public_changing_on_sync=False,
-                         no_source=False):
-    versions = get_cell_versions(cell)
-    repos = ['building', 'shadow-fixed', 'ros/public']
+def format_versions_cell(versions, codes, url=None):
     search_suffixes = ['1', '2', '3']
-    # set the latest_version to None if no package expected
-    if no_source:
-        latest_version = None
     cell = ''.join([format_version(v,
-                                   latest_version,
+                                   c,
                                    r,
                                    s,
-                                   versions[-1],
                                    url if r == 'building' else None)\
-                        for v, r, s in zip(versions, repos, search_suffixes)])
+                        for v, c, r, s in zip(versions, codes,
+                                              CELL_REPOS, search_suffixes)])
 
-    if public_changing_on_sync:
+    if codes[0] & SYNC_CHANGE:
         cell += '<span class="hiddentext">sync</span>'
 
     return cell
 
 
-def format_version(version, latest, repo, search_suffix,
-                   public_version, url=None):
+def format_version(version, code, repo, search_suffix, url=None):
     label = '%s: %s' % (repo, version)
-    if latest:
-        color = {'None': 'pkgMissing',
-                 latest: 'pkgLatest'}.get(version, 'pkgOutdated')
-        # use reasonable names (even if invisible) to be searchable
-        order_value = {'None': '5&nbsp;red',
-                       latest: '1&nbsp;green'}.get(version, '3&nbsp;blue')
-    else:
-        color = {'None': 'pkgIgnore'}.get(version, 'pkgObsolete')
-        # use reasonable names (even if invisible) to be searchable
-        order_value = {'None': '2&nbsp;gray'}.get(version, '4&nbsp;yellow')
+    # use reasonable names (even if invisible) to be searchable
+    color, order_value = STATE_STYLES[code & STATE_MASK]
     order_value += search_suffix
-    if repo != 'ros/public' and is_regression(version, public_version):
+    if code & REGRESSION:
         order_value += '&nbsp;regression' + search_suffix
     if url:
         order_value = '<a href="%s">%s</a>' % (url, order_value)
     return make_square_div(label, color, order_value)
 
 
+def is_same_version(version, other):
+    try:
+        return compare_debian_versions(version, other) == 0
+    except ValueError:
+        return version == other
+
+
 def is_regression(version, public_version):
+    if public_version == 'None':
+        return False
     # public has a package and specific repo doesn't
-    return public_version != 'None' and version == 'None'
+    if version == 'None':
+        return True
+    # syncing the specific repo to public would downgrade the package
+    try:
+        return compare_debian_versions(version, public_version) < 0
+    except ValueError:
+        return False
 
 
 def make_square_div(label, color, order_value):
@@ -499,7 +1055,36 @@ def make_square_div(label, color, order_value):
         (color, label, order_value)
 
 
-def make_html_head(rosdistro, start_time):
+def make_html_head(rosdistro, start_time, column_count=12, feed_url=None,
+                   metadata_columns=None):
+    """
+    @param column_count: number of columns of the table
+    @param feed_url: url of the JSON feed written by L{write_json} to
+    load the rows from, rendering them only when they are displayed;
+    the rows are part of the page if None
+    @param metadata_columns: metadata of the columns, for the links of
+    the rows loaded from the feed
+    """
+    if feed_url is None:
+        feed_script = ''
+        table_options = '''            "bPaginate": false,
+'''
+    else:
+        feed_script = make_feed_script(metadata_columns)
+        table_options = '''            "bPaginate": true,
+            "sPaginationType": "full_numbers",
+            "iDisplayLength": 100,
+            "bDeferRender": true,
+            "sAjaxSource": %s,
+            "sAjaxDataProp": "rows",
+            "fnServerData": load_status_feed,
+            "aoColumns": status_columns(),
+''' % json.dumps(feed_url)
+    column_filters = ['{ type: "text" }', '{ type: "text" }',
+                      '{ type: "select",  values: %s }' %
+                      str(['wet', 'dry', 'variant', 'unknown'])] + \
+        ['{ type: "text" }'] * (column_count - 3)
+    column_filters = ',\n'.join(' ' * 16 + f for f in column_filters)
     rosdistro = rosdistro[0].upper() + rosdistro[1:]
     # Some of the code here is taken from a datatables example.
     return '''
@@ -560,7 +1145,7 @@ def make_html_head(rosdistro, start_time):
 
 <script type="text/javascript" charset="utf-8">
     /* <![CDATA[ */
-    function simple_tooltip(target_items, name) {
+%s    function simple_tooltip(target_items, name) {
         $(target_items).each(function(i){
             $("body").append("<div class='" + name + "' id='" + name + i + "'><p>" + $(this).attr('title') + "</p></div>");
             var my_tooltip = $("#" + name + i);
@@ -579,8 +1164,7 @@ def make_html_head(rosdistro, start_time):
     $(document).ready(function() {
         var oTable = $('#csv_table').dataTable( {
             "bJQueryUI": true,
-            "bPaginate": false,
-            "bStateSave": true,
+%s            "bStateSave": true,
             "iCookieDuration": 60*60*24*7,
             "sDom": 'T<"clear">lfrtip',
             "oTableTools": {
@@ -588,23 +1172,12 @@ def make_html_head(rosdistro, start_time):
                 "sRowSelect": "multi"
             },
             "oLanguage": {
-                "sSearch": '<span id="search" title="Special keywords to search for: diff, sync, regression, green, blue, red, yellow, gray">Search:</span>'
+                "sSearch": '<span id="search" title="Special keywords to search for: diff, sync, regression (missing or older than in ros/public), green, blue, red, yellow, gray">Search:</span>'
             }
         } );
         oTable.columnFilter( {
             "aoColumns": [
-                { type: "text" },
-                { type: "text" },
-                { type: "select",  values: ['wet', 'dry', 'variant', 'unknown'] },
-                { type: "text" },
-                { type: "text" },
-                { type: "text" },
-                { type: "text" },
-                { type: "text" },
-                { type: "text" },
-                { type: "text" },
-                { type: "text" },
-                { type: "text" }
+%s
             ],
             "bUseColVis": true
         } );
@@ -636,7 +1209,92 @@ def make_html_head(rosdistro, start_time):
     } );
     /* ]]> */
 </script>
-''' % (rosdistro, time.strftime('%Y-%m-%d %H:%M:%S %Z', start_time))
+''' % (rosdistro, time.strftime('%Y-%m-%d %H:%M:%S %Z', start_time),
+       feed_script, table_options, column_filters)
+
+
+def make_feed_script(metadata_columns):
+    """
+    @return: javascript which loads the rows of the JSON feed and renders
+    each cell from its version ids and state codes only when DataTables
+    displays it, with the same squares, links and search keywords as
+    the rows of a static page
+    """
+    job_urls = [md['job_url'] if md else None for md in metadata_columns[3:]]
+    return '''\
+    var STATE_MASK = %d, REGRESSION = %d, SYNC_CHANGE = %d;
+    var status_repo_labels = %s;
+    var status_styles = %s;
+    var status_job_urls = %s;
+    var status_feed = null;
+
+    function load_status_feed(source, data, callback) {
+        $.getJSON(source, function(feed) {
+            status_feed = feed;
+            callback(feed);
+        });
+    }
+
+    function get_job_url(row, column) {
+        var url = status_job_urls[column];
+        // no links for unknown and variant rows and the source columns of dry rows
+        if (!url || row[2] == 'unknown' || row[2] == 'variant' ||
+                (row[2] == 'dry' && /_source$/.test(status_feed.columns[column]))) {
+            return null;
+        }
+        return url.replace('{pkg}', row[0].replace(/_/g, '-'));
+    }
+
+    function render_name(data, type, row) {
+        if (!row[3]) {
+            return data;
+        }
+        return data + (type == 'display' ? ' <span class="hiddentext">diff</span>' : ' diff');
+    }
+
+    function render_versions(column) {
+        return function(data, type, row) {
+            var repos = status_feed.repos.length;
+            var cell = '';
+            var text = [];
+            for (var j = 0; j < repos; j++) {
+                var code = row[5][column * repos + j];
+                var style = status_styles[code & STATE_MASK];
+                var order_value = style[1] + (j + 1);
+                if (code & REGRESSION) {
+                    order_value += '&nbsp;regression' + (j + 1);
+                }
+                text.push(order_value.replace(/&nbsp;/g, ' '));
+                if (type != 'display') {
+                    continue;
+                }
+                var url = j == 0 ? get_job_url(row, column) : null;
+                if (url) {
+                    order_value = '<a href="' + url + '">' + order_value + '</a>';
+                }
+                cell += '<div class="square ' + style[0] + '" title="' + status_repo_labels[j] + ': ' +
+                    status_feed.versions[row[4][column * repos + j]] + '">' + order_value + '</div>';
+            }
+            if (row[5][column * repos] & SYNC_CHANGE) {
+                cell += '<span class="hiddentext">sync</span>';
+                text.push('sync');
+            }
+            return type == 'display' ? cell : text.join(' ');
+        };
+    }
+
+    function status_columns() {
+        var columns = [{"mData": 0, "mRender": render_name}, {"mData": 1}, {"mData": 2}];
+        for (var i = 0; i < status_job_urls.length; i++) {
+            columns.push({"mData": 4, "mRender": render_versions(i)});
+        }
+        return columns;
+    }
+
+''' % (STATE_MASK, REGRESSION, SYNC_CHANGE,
+       json.dumps(CELL_REPOS),
+       json.dumps([STATE_STYLES[code] for code in sorted(STATE_STYLES)]),
+       json.dumps(job_urls))
 
 
 def make_html_legend():
@@ -648,7 +1306,8 @@ def make_html_legend():
         ('<span class="square pkgOutdated">&nbsp;</span>', 'different version'.replace(' ', '&nbsp;')),
         ('<span class="square pkgMissing">&nbsp;</span>', 'missing'.replace(' ', '&nbsp;')),
         ('<span class="square pkgObsolete">&nbsp;</span>', 'obsolete'.replace(' ', '&nbsp;')),
-        ('<span class="square pkgIgnore">&nbsp;</span>', 'intentionally missing'.replace(' ', '&nbsp;'))
+        ('<span class="square pkgIgnore">&nbsp;</span>', 'intentionally missing'.replace(' ', '&nbsp;')),
+        ('regression', 'search keyword of the repos (1) or (2) which miss a package of (3) or have an older version of it')
     ]
     definitions = ['<li><b>%s:</b>&nbsp;%s</li>' % (k, v) for (k, v) in definitions]
     return '''\
@@ -658,22 +1317,17 @@ def make_html_legend():
 ''' % ('\n'.join(definitions))
 
 
-def make_html_table(columns, counts, rows):
+def iter_html_table(columns, counts, rows):
     '''
-    Returns a string containing an HTML-formatted table, given a header and some
-    rows.
-
-    >>> make_html_table(header=['a'], rows=[[1], [2]])
-    '<table>\\n<tr><th>a</th></tr>\\n<tr><td>1</td></tr>\\n<tr><td>2</td></tr>\\n</table>\\n'
-
+    Generate an HTML table with the column sums in its header piece by
+    piece, a row at a time, C{rows} may be an iterator.
     '''
     headers = []
     for i in range(len(columns)):
         headers.append('%s<br/>%s' % (columns[i], ''.join(['<span class="sum repo%s">%d</span>' % (i + 1, v) for i, v in enumerate(counts[i])])))
     header_str = '<tr>' + ''.join('<th>%s</th>' % c for c in headers) + '</tr>'
-    rows_str = '\n'.join('<tr>' + ' '.join('<td>%s</td>' % c for c in r) + '</tr>' for r in rows)
     footer_str = '<tr>' + ''.join('<th>%s</th>' % (c if i != 2 else '') for i, c in enumerate(columns)) + '</tr>'
-    return '''\
+    yield '''\
 <table class="display" id="csv_table">
     <thead>
         %s
@@ -682,23 +1336,30 @@ def make_html_table(columns, counts, rows):
         %s
     </tfoot>
     <tbody>
-        %s
+        ''' % (header_str, footer_str)
+    for i, r in enumerate(rows):
+        yield ('\n<tr>' if i else '<tr>') + ' '.join('<td>%s</td>' % c for c in r) + '</tr>'
+    yield '''
     </tbody>
 </table>
-''' % (header_str, footer_str, rows_str)
+'''
 
 
-def make_html_doc(head, body):
+def iter_html_doc(head, body):
     '''
-    Returns the contents of an HTML page, given a title and body.
+    Generate an HTML page piece by piece, C{body} being an iterable of
+    strings.
     '''
-    return '''<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+    yield '''<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
 <html xmlns="http://www.w3.org/1999/xhtml" lang="en" xml:lang="en">
     <head>
-        %(head)s
+        %s
     </head>
     <body>
-        %(body)s
+        ''' % head
+    for chunk in body:
+        yield chunk
+    yield '''
     </body>
 </html>
-''' % locals()
+'''
@@ -0,0 +1,152 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2013, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+What the previous run of the status page computed, so that a run can
+tell which packages changed since and skip a page which did not.
+
+For every (repo, column) of the table the state keeps the fingerprint
+of the apt lists the column was read from and the versions read from
+them, along with the rows of the table.
+"""
+
+import json
+import os
+import tempfile
+
+from .index_diff import diff_versions
+
+
+def get_row_key(row):
+    """
+    @return: (name, type) identifying a row of the table, as a name can
+    have both a wet and a dry or variant row
+    """
+    return row[0], row[2]
+
+
+class StatusState(object):
+
+    def __init__(self, header, rows, fingerprints=None, index_versions=None):
+        """
+        @param header: column names of the table
+        @param rows: rows of the table, sequences of strings
+        @param fingerprints: dict mapping (repo, column) to the
+        fingerprint of the apt lists read for it
+        @param index_versions: dict mapping (repo, column) to dicts of
+        debian package names and versions
+        """
+        self.header = list(header)
+        self.rows = dict((get_row_key(row), list(row)) for row in rows)
+        self.fingerprints = fingerprints or {}
+        self.index_versions = index_versions or {}
+
+    def has_same_table(self, other):
+        return other is not None and self.header == other.header and \
+            self.rows == other.rows
+
+    def get_changed_names(self, fingerprints, index_versions,
+                          get_row_name):
+        """
+        Find the packages whose versions changed in any index since
+        this state was saved.  Indexes whose fingerprint did not change
+        are skipped, the others are compared with L{diff_versions}.
+        @param get_row_name: function returning the name of the row of
+        a debian package name, also for the packages which are not in
+        the rosdistro or were removed from the index
+        @return: set of row names
+        """
+        changed = set()
+        # an index which is no longer read lost all its versions
+        keys = set(index_versions) | set(self.index_versions)
+        for key in keys:
+            if key in fingerprints and \
+                    fingerprints[key] == self.fingerprints.get(key):
+                continue
+            diff = diff_versions(self.index_versions.get(key, {}),
+                                 index_versions.get(key, {}))
+            changed.update(get_row_name(name)
+                           for name, _, _, _ in diff.get_changed())
+        return changed
+
+
+def _encode_key(key):
+    return '|'.join(key)
+
+
+def _decode_key(key):
+    return tuple(str(k) for k in key.split('|'))
+
+
+def _to_str(value):
+    # json returns unicode strings
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    if isinstance(value, list):
+        return [_to_str(v) for v in value]
+    if isinstance(value, dict):
+        return dict((_to_str(k), _to_str(v)) for k, v in value.iteritems())
+    return value
+
+
+def load_state(path):
+    """
+    @return: the L{StatusState} saved at C{path}, or None if there is
+    none or it cannot be read
+    """
+    try:
+        with open(path) as f:
+            data = _to_str(json.load(f))
+        return StatusState(
+            data['header'], data['rows'],
+            dict((_decode_key(k), v)
+                 for k, v in data['fingerprints'].iteritems()),
+            dict((_decode_key(k), v)
+                 for k, v in data['index_versions'].iteritems()))
+    except (IOError, ValueError, KeyError):
+        return None
+
+
+def save_state(path, state):
+    data = {
+        'header': state.header,
+        'rows': sorted(state.rows.values()),
+        'fingerprints': dict((_encode_key(k), v)
+                             for k, v in state.fingerprints.iteritems()),
+        'index_versions': dict((_encode_key(k), v)
+                               for k, v in state.index_versions.iteritems()),
+    }
+    # a run interrupted while saving must not leave a truncated state
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f)
+    os.rename(tmp_path, path)
@@ -0,0 +1,84 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2013, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Tables of the values shared by all parsed repository indexes.
+
+The same package names, versions and dependency lists show up in every
+repository, distro and architecture.  Indexes store the small integer
+ids of these tables in compact arrays, so each distinct value is held
+in memory once however many indexes refer to it.
+"""
+
+import threading
+
+
+class StringTable(object):
+    """
+    Maps hashable values to consecutive integer ids and back.  Ids are
+    never reused, so they stay valid for the lifetime of the process.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._values = []
+        # indexes are parsed from several threads at once
+        self._lock = threading.Lock()
+
+    def get_id(self, value):
+        value_id = self._ids.get(value)
+        if value_id is None:
+            with self._lock:
+                value_id = self._ids.get(value)
+                if value_id is None:
+                    value_id = len(self._values)
+                    self._values.append(value)
+                    self._ids[value] = value_id
+        return value_id
+
+    def get_canonical(self, value):
+        """
+        @return: the instance of C{value} stored in the table
+        """
+        return self._values[self.get_id(value)]
+
+    def __getitem__(self, value_id):
+        return self._values[value_id]
+
+    def __len__(self):
+        return len(self._values)
+
+
+# names, versions and other fields of all indexes
+strings = StringTable()
+# tuples of dependency relations, made of canonical strings
+depends = StringTable()
@@ -0,0 +1,205 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2013, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Version ordering of debian and rpm packages.
+
+L{debian_version_key} and L{rpm_version_key} turn a version string into
+a tuple which sorts exactly like dpkg --compare-versions and rpmvercmp
+do, so max() and sorted() over many versions are plain tuple
+comparisons.  Keys are cached, since the same versions show up over and
+over across repositories and architectures.
+"""
+
+import re
+
+_digits_rx = re.compile(r'(\d+)')
+_rpm_segment_rx = re.compile(r'(~|\^|\d+|[a-zA-Z]+)')
+_dist_tag_rx = re.compile(r'\.(fc|el|rhel)\d+(\.\d+)*$')
+
+_debian_key_cache = {}
+_rpm_key_cache = {}
+
+# ends a dpkg key; shorter strings compare against it
+_DEBIAN_END = ((0,), 0)
+# rpm segment types, in the order rpmvercmp sorts them
+_RPM_TILDE, _RPM_END, _RPM_CARET, _RPM_ALPHA, _RPM_NUMERIC = range(5)
+
+
+def _dpkg_order(c):
+    if c == '~':
+        return -1
+    if c.isalpha():
+        return ord(c)
+    return ord(c) + 256
+
+
+def _dpkg_string_key(s):
+    """
+    Key for one part of a debian version, following dpkg's verrevcmp:
+    alternating non-digit strings, compared character by character with
+    '~' before everything and letters before other characters, and
+    numbers.
+    """
+    parts = _digits_rx.split(s)
+    if len(parts) % 2:
+        parts.append('0')
+    key = []
+    for i in range(0, len(parts), 2):
+        key.append((tuple(_dpkg_order(c) for c in parts[i]) + (0,), int(parts[i + 1] or 0)))
+    while key and key[-1] == _DEBIAN_END:
+        key.pop()
+    key.append(_DEBIAN_END)
+    return tuple(key)
+
+
+def split_debian_version(version):
+    """
+    @return: (epoch, upstream version, debian revision) of C{version},
+    with an epoch of 0 and an empty revision where they are omitted
+    """
+    epoch, sep, rest = version.partition(':')
+    if not sep:
+        epoch, rest = '0', version
+    upstream, sep, revision = rest.rpartition('-')
+    if not sep:
+        upstream, revision = rest, ''
+    return int(epoch or 0), upstream, revision
+
+
+def debian_version_key(version):
+    """
+    @return: sort key ordering C{version} like dpkg does
+    @raise ValueError: if the epoch is not a number
+    """
+    key = _debian_key_cache.get(version)
+    if key is None:
+        epoch, upstream, revision = split_debian_version(version)
+        key = (epoch, _dpkg_string_key(upstream), _dpkg_string_key(revision))
+        _debian_key_cache[version] = key
+    return key
+
+
+def _rpm_string_key(s):
+    """
+    Key for a version or release, following rpmvercmp: separators are
+    ignored, '~' sorts before and '^' after the end of the string,
+    numeric segments are newer than alphabetic ones.
+    """
+    key = []
+    for segment in _rpm_segment_rx.findall(s):
+        if segment == '~':
+            key.append((_RPM_TILDE,))
+        elif segment == '^':
+            key.append((_RPM_CARET,))
+        elif segment.isdigit():
+            key.append((_RPM_NUMERIC, int(segment)))
+        else:
+            key.append((_RPM_ALPHA, segment))
+    key.append((_RPM_END,))
+    return tuple(key)
+
+
+def split_rpm_version(evr):
+    """
+    @return: (epoch, version, release) of an 'epoch:version-release'
+    string, with an epoch of 0 and an empty release where they are
+    omitted
+    """
+    epoch, sep, rest = evr.partition(':')
+    if not sep:
+        epoch, rest = '0', evr
+    version, sep, release = rest.rpartition('-')
+    if not sep:
+        version, release = rest, ''
+    return int(epoch or 0), version, release
+
+
+def rpm_version_key(evr):
+    """
+    @param evr: 'epoch:version-release', epoch and release are optional
+    @return: sort key ordering C{evr} like rpm does
+    @raise ValueError: if the epoch is not a number
+    """
+    key = _rpm_key_cache.get(evr)
+    if key is None:
+        epoch, version, release = split_rpm_version(evr)
+        key = (epoch, _rpm_string_key(version), _rpm_string_key(release))
+        _rpm_key_cache[evr] = key
+    return key
+
+
+def strip_dist_tag(release):
+    """
+    Remove a trailing dist tag like '.fc19' or '.el6' from an rpm
+    release.
+    """
+    return _dist_tag_rx.sub('', release)
+
+
+def rpm_release_matches(release, expected, prefix=False):
+    """
+    Compare two rpm releases by rpm ordering, ignoring dist tags.
+    @param prefix: only require the segments of C{expected} to start
+    the segments of C{release}, e.g. '0' matches '0.20130405.fc19'
+    """
+    key = _rpm_string_key(strip_dist_tag(release))[:-1]
+    expected_key = _rpm_string_key(strip_dist_tag(expected))[:-1]
+    if prefix:
+        return key[:len(expected_key)] == expected_key
+    return key == expected_key
+
+
+def compare_debian_versions(a, b):
+    """
+    @return: negative, zero or positive as C{a} is older than, equal to
+    or newer than C{b}
+    """
+    return cmp(debian_version_key(a), debian_version_key(b))
+
+
+def compare_rpm_versions(a, b):
+    """
+    @return: negative, zero or positive as C{a} is older than, equal to
+    or newer than C{b}
+    """
+    return cmp(rpm_version_key(a), rpm_version_key(b))
+
+
+def newest_version(versions, key=debian_version_key):
+    """
+    @return: the newest of C{versions}, or None if there are none
+    """
+    versions = list(versions)
+    if not versions:
+        return None
+    return max(versions, key=key)
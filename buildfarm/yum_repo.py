@@ -0,0 +1,225 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2013, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Reader for the repodata of yum repositories.
+
+repomd.xml is followed to the primary package list, read from the
+primary.sqlite database when the repository publishes one and otherwise
+streamed from primary.xml with iterparse.  Both are fetched through the
+L{index_cache}, so unchanged metadata is not downloaded again, and the
+packages are kept in an L{RpmIndex} keyed by name.
+"""
+
+import logging
+import sqlite3
+import xml.etree.cElementTree as ElementTree
+
+from . import index_cache, string_table
+from .version import split_rpm_version, rpm_version_key, rpm_release_matches
+
+_REPO_NS = '{http://linux.duke.edu/metadata/repo}'
+_COMMON_NS = '{http://linux.duke.edu/metadata/common}'
+
+
+class RpmEntry(object):
+    """
+    A single package of a yum repository.
+    """
+    __slots__ = ['name', 'epoch', 'version', 'release', 'arch']
+
+    def __init__(self, name, epoch, version, release, arch):
+        self.name = name
+        self.epoch = epoch
+        self.version = version
+        self.release = release
+        self.arch = arch
+
+    @property
+    def evr(self):
+        if self.epoch and self.epoch != '0':
+            return '%s:%s-%s' % (self.epoch, self.version, self.release)
+        return '%s-%s' % (self.version, self.release)
+
+
+class RpmIndex(object):
+    """
+    The packages of one yum repository keyed by name, built once from
+    the repodata and shared by all queries against it.
+    """
+
+    def __init__(self):
+        self._packages = {}
+
+    def add(self, name, epoch, version, release, arch):
+        # share the strings with all other indexes
+        name, epoch, version, release, arch = [string_table.strings.get_canonical(v)
+                                               for v in (name, epoch or '0', version, release, arch)]
+        entry = RpmEntry(name, epoch, version, release, arch)
+        self._packages.setdefault(name, []).append(entry)
+
+    def __contains__(self, name):
+        return name in self._packages
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._packages.itervalues())
+
+    def names(self):
+        return self._packages.keys()
+
+    def entries(self, name=None):
+        """
+        @return: all L{RpmEntry}s for C{name}, or of the whole index if
+        C{name} is None
+        """
+        if name is not None:
+            return self._packages.get(name, [])
+        return [e for entries in self._packages.itervalues() for e in entries]
+
+    def versions(self, name):
+        return [e.evr for e in self._packages.get(name, [])]
+
+    def has_version(self, name, evr, full_match=True, arch=None):
+        """
+        @param evr: '[epoch:]version[-release]' to look for.  The
+        version has to be equal by rpm ordering, the release is compared
+        without its dist tag and may be omitted to accept any release.
+        The epoch is only compared if given.
+        @param full_match: require the whole release to match rather
+        than its leading segments, see L{rpm_release_matches}
+        @param arch: only consider packages built for C{arch}
+        """
+        entries = self._packages.get(name)
+        if not entries:
+            return False
+        epoch, version, release = split_rpm_version(evr)
+        version_key = rpm_version_key(version)[1]
+        for e in entries:
+            if arch is not None and e.arch != arch:
+                continue
+            if ':' in evr and int(e.epoch) != epoch:
+                continue
+            if rpm_version_key(e.version)[1] != version_key:
+                continue
+            if release and not rpm_release_matches(e.release, release, prefix=not full_match):
+                continue
+            return True
+        return False
+
+
+def parse_repomd(lines):
+    """
+    @param lines: repomd.xml as a file object
+    @return: dict mapping the data types (e.g. 'primary', 'primary_db')
+    to (location, sha256 of the uncompressed file or None)
+    """
+    data = {}
+    for _, elem in ElementTree.iterparse(lines):
+        if elem.tag != _REPO_NS + 'data':
+            continue
+        location = elem.find(_REPO_NS + 'location').get('href')
+        open_checksum = elem.find(_REPO_NS + 'open-checksum')
+        sha256 = None
+        if open_checksum is not None and open_checksum.get('type') == 'sha256':
+            sha256 = open_checksum.text.strip()
+        data[elem.get('type')] = (location, sha256)
+    return data
+
+
+def iter_primary_xml(f):
+    """
+    Stream the packages of a primary.xml file, discarding every package
+    element once it is read.
+    @return: iterator of (name, epoch, version, release, arch)
+    """
+    context = ElementTree.iterparse(f, events=('start', 'end'))
+    _, root = next(context)
+    for event, elem in context:
+        if event == 'end' and elem.tag == _COMMON_NS + 'package':
+            version = elem.find(_COMMON_NS + 'version')
+            yield (elem.findtext(_COMMON_NS + 'name'), version.get('epoch'),
+                   version.get('ver'), version.get('rel'),
+                   elem.findtext(_COMMON_NS + 'arch'))
+            root.clear()
+
+
+def iter_primary_db(path):
+    """
+    @param path: path of an uncompressed primary.sqlite database
+    @return: iterator of (name, epoch, version, release, arch)
+    """
+    connection = sqlite3.connect(path)
+    try:
+        for row in connection.execute('SELECT name, epoch, version, release, arch FROM packages'):
+            yield tuple(str(v) if v is not None else None for v in row)
+    finally:
+        connection.close()
+
+
+def load_rpm_index(base_url, cache=None):
+    """
+    Fetch the repodata of the yum repository at C{base_url} and index
+    its packages.
+    @param base_url: url of the directory containing repodata/
+    @param cache: L{index_cache.IndexCache} to fetch through, the
+    default cache if None
+    @rtype: L{RpmIndex}
+    @raise urllib2.URLError: if the repodata cannot be fetched
+    @raise IOError: if the repodata cannot be read
+    """
+    if cache is None:
+        cache = index_cache.get_default_cache()
+    with open(cache.fetch(base_url + '/repodata/repomd.xml')) as f:
+        data = parse_repomd(f)
+
+    # the repodata file names change with their content, so each type is
+    # kept in one cache entry which the next version replaces
+    index = RpmIndex()
+    if 'primary_db' in data:
+        location, sha256 = data['primary_db']
+        try:
+            path = cache.fetch(base_url + '/' + location, sha256, decompress=True,
+                               key=base_url + '/repodata#primary_db')
+            for row in iter_primary_db(path):
+                index.add(*row)
+            return index
+        except (IOError, sqlite3.DatabaseError) as ex:
+            logging.warn('Failed to read %s/%s, falling back to primary.xml: %s', base_url, location, ex)
+            index = RpmIndex()
+    if 'primary' not in data:
+        raise IOError('%s/repodata/repomd.xml lists no primary data' % base_url)
+    location, sha256 = data['primary']
+    with open(cache.fetch(base_url + '/' + location, sha256, decompress=True,
+                          key=base_url + '/repodata#primary'), 'rb') as f:
+        for row in iter_primary_xml(f):
+            index.add(*row)
+    return index
@@ -50,7 +50,7 @@ import time
 import rospkg.distro
 
 from core import debianize_name, debianize_version
-from repo import deb_in_repo, load_Packages, get_repo_version, get_stack_version, BadRepo
+from repo import deb_in_repo, load_Packages, get_repo_version, get_stack_version, prefetch_Packages, BadRepo
 
 NAME = 'list_missing.py' 
 TARBALL_URL = "https://code.ros.org/svn/release/download/stacks/%(stack_name)s/%(base_name)s/%(f_name)s"
@@ -397,6 +397,12 @@ def generate_allhtml_report(output, distro_name, os_platforms):
     h = hudson.Hudson(HUDSON)
     distro = load_distro(distro_name)
 
+    # download every Packages list the report needs concurrently up
+    # front instead of one after another while walking the stacks
+    prefetch_Packages([(repo, os_platform, arch)
+                       for repo in [ROS_REPO, SHADOW_REPO, SHADOW_FIXED_REPO]
+                       for os_platform in os_platforms for arch in ARCHES])
+
     main_repo = {}
     arches = ARCHES
     for os_platform in os_platforms:
@@ -39,6 +39,8 @@ Utilities for reading state from a debian repo
 import urllib2
 import re
 
+from buildfarm.index_cache import get_default_cache
+from buildfarm.repo import fetch_concurrently, parse_Packages_index
 from .core import debianize_name
 
 class BadRepo(Exception): pass
@@ -59,18 +61,33 @@ def get_Packages(repo_url, os_platform, arch, cache=None):
     # without potentially breaking a lot. Using an if statement to get
     # it to work.
     if 'packages.ros.org/ros' in repo_url or 'shadow' in repo_url:
-        packages_url = repo_url + '/ubuntu/dists/%(os_platform)s/main/binary-%(arch)s/Packages'%locals()
+        dists_url = repo_url + '/ubuntu/dists/%(os_platform)s'%locals()
     else:
-        packages_url = repo_url + '/dists/%(os_platform)s/main/binary-%(arch)s/Packages'%locals()
+        dists_url = repo_url + '/dists/%(os_platform)s'%locals()
+    index_path = 'main/binary-%(arch)s/Packages'%locals()
+    packages_url = dists_url + '/' + index_path
     if packages_url in cache:
         return cache[packages_url]
     else:
+        # persisted across processes, transferred compressed and
+        # revalidated instead of downloaded again when unchanged
         try:
-            cache[packages_url] = retval = urllib2.urlopen(packages_url).read()
+            with get_default_cache().open_index(dists_url, index_path) as f:
+                cache[packages_url] = retval = f.read()
         except urllib2.HTTPError:
             raise BadRepo("[%s]: %s"%(repo_url, packages_url))
     return retval
     
+def prefetch_Packages(targets, cache=None, max_workers=8):
+    """
+    Download the package lists for all (repo_url, os_platform, arch)
+    C{targets} concurrently, so later lookups are served from C{cache}.
+    @return: dict mapping the targets which failed to their error
+    """
+    def fetch(repo_url, os_platform, arch):
+        get_Packages(repo_url, os_platform, arch, cache)
+    return fetch_concurrently(fetch, targets, max_workers, errors=(BadRepo, urllib2.URLError))
+
 def parse_Packages(packagelist):
     """
     Parse debian Packages list into (package, version, depends) tuples
@@ -111,32 +128,28 @@ def deb_in_repo(repo_url, deb_name, deb_version, os_platform, arch, use_regex=Tr
         M = re.search('^Package: %s\nVersion: %s$'%(deb_name, deb_version), packagelist, re.MULTILINE)
         return M is not None
 
+def get_Packages_index(repo_url, os_platform, arch, cache=None):
+    """
+    Retrieve the package list from the shadow repo as a
+    L{buildfarm.repo.PackagesIndex}, parsed once per list.
+    """
+    if cache is None:
+        cache = _Packages_cache
+    key = ('index', repo_url, os_platform, arch)
+    if key not in cache:
+        cache[key] = parse_Packages_index(get_Packages(repo_url, os_platform, arch, cache))
+    return cache[key]
+
 def get_depends(repo_url, deb_name, os_platform, arch):
     """
-    Get all debian package dependencies by scraping the Packages
-    list. We mainly use this for invalidation logic. 
+    Get all debian packages depending on C{deb_name} by scraping the
+    Packages list. We mainly use this for invalidation logic. 
     """
     # There is probably something much simpler we could do, but this
     # more robust to any bad state we may have caused to the shadow
     # repo.
-    package_deps = load_Packages(repo_url, os_platform, arch)
-    done = False
-    queue = [deb_name]
-    depends = set()
-    # This is not particularly efficient, but it does not need to
-    # be. Basically, we find all the packages that depend on the
-    # package, then find all the packages that depends on those,
-    # etc...
-    while queue:
-        next  = queue[0]
-        queue = queue[1:]
-        for package, _, deps, _ in package_deps:
-            #strip of version specifications from deps
-            deps = [d.split()[0] for d in deps]
-            if package not in depends and next in deps:
-                queue.append(package)
-                depends.add(package)
-    return list(depends)
+    index = get_Packages_index(repo_url, os_platform, arch)
+    return list(index.get_dependents([deb_name]))
 
 def get_stack_version(packageslist, distro_name, stack_name):
     """
@@ -1,6 +1,5 @@
 #!/usr/bin/env python
 
-import apt
 import argparse
 import sys
 
@@ -15,19 +14,34 @@ def parse_options():
                         help="what packages to test for.")
     parser.add_argument("-u", "--update", dest="update", action='store_true', default=False,
                         help="update the cache from the server")
-    return parser.parse_args()
+    parser.add_argument("--repo", dest="repo_url",
+                        help="look the packages up in the Packages list of this repo instead of the apt cache, requires --distro and --arch")
+    parser.add_argument("--distro", dest="distro",
+                        help="Ubuntu distro lucid, precise, etc")
+    parser.add_argument("--arch", dest="arch",
+                        help="The arch amd64 i386")
+    args = parser.parse_args()
+    if (args.repo_url, args.distro, args.arch).count(None) not in (0, 3):
+        parser.error("--repo, --distro and --arch must be given together")
+    return args
 
 if __name__ == "__main__":
     args = parse_options()
 
-    c = apt.Cache(rootdir=args.rootdir)
-    if args.update:
-        c.update()
+    if args.repo_url:
+        import buildfarm.repo
+        # only the stanzas of the requested packages are parsed
+        c = buildfarm.repo.get_mapped_index(args.repo_url, args.distro, args.arch)
+    else:
+        import apt
+        c = apt.Cache(rootdir=args.rootdir)
+        if args.update:
+            c.update()
 
-    c.open()  # required to recall open after updating or you will query the old data
+        c.open()  # required to recall open after updating or you will query the old data
 
+    failure = False
     for p in args.packages:
-        failure = False
         if p not in c:
             print "Package %s missing in repo." % p
             failure = True
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+"""
+Measure the memory held by parsed repository indexes, comparing the
+tuple lists of parse_Packages with the shared, column-wise
+PackagesIndex.  Synthetic Packages lists stand in for the repos: every
+index lists the same packages, with the versions differing between
+repos like building, shadow-fixed and public do.
+"""
+
+import argparse
+import gc
+import os
+import subprocess
+import sys
+
+import buildfarm.repo
+
+
+def parse_options():
+    parser = argparse.ArgumentParser(description="Measure the memory footprint of parsed repository indexes.")
+    parser.add_argument('--packages', dest='packages', type=int, default=20000,
+           help='Packages per index')
+    parser.add_argument('--indexes', dest='indexes', type=int, default=12,
+           help='Number of indexes, e.g. 3 repos x 2 distros x 2 arches')
+    parser.add_argument('--format', dest='format', choices=['tuples', 'index'],
+           help='Measure only this representation, in this process')
+    return parser.parse_args()
+
+
+def iter_synthetic_Packages(packages, index_number):
+    repo = index_number % 3
+    for i in xrange(packages):
+        name = 'ros-hydro-package-%05d' % i
+        # a third of the packages differ between repos
+        version = '1.%d.%d-0precise-20130405-%04d-+0000' % (i % 7, repo if i % 3 == 0 else 0, i % 1000)
+        depends = ', '.join(['ros-hydro-package-%05d (>= 1.0)' % ((i + j * 37) % packages) for j in range(1, 1 + i % 6)] +
+                            ['libc6 (>= 2.15)', 'libboost-all-dev'])
+        for l in ['Package: %s\n' % name,
+                  'Version: %s\n' % version,
+                  'Architecture: amd64\n',
+                  'Maintainer: ROS buildfarm <ros@example.com>\n',
+                  'Installed-Size: 1234\n',
+                  'Depends: %s\n' % depends,
+                  'Filename: pool/main/r/%s/%s_%s_amd64.deb\n' % (name, name, version),
+                  'Size: 56789\n',
+                  'MD5sum: 0123456789abcdef0123456789abcdef\n',
+                  'Description: Synthetic package %d\n' % i,
+                  ' used to measure the footprint of parsed indexes.\n',
+                  '\n']:
+            yield l
+
+
+def get_resident_bytes():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def measure(fmt, packages, indexes):
+    gc.collect()
+    before = get_resident_bytes()
+    parsed = []
+    for i in range(indexes):
+        lines = iter_synthetic_Packages(packages, i)
+        if fmt == 'tuples':
+            parsed.append(buildfarm.repo.parse_Packages(lines))
+        else:
+            parsed.append(buildfarm.repo.parse_Packages_index(lines))
+    gc.collect()
+    return get_resident_bytes() - before
+
+
+if __name__ == "__main__":
+    args = parse_options()
+    if args.format:
+        print measure(args.format, args.packages, args.indexes)
+        sys.exit(0)
+
+    # measure each representation in a fresh interpreter
+    print "%d packages x %d indexes" % (args.packages, args.indexes)
+    for fmt in ['tuples', 'index']:
+        output = subprocess.check_output([sys.executable, __file__, '--format', fmt,
+                                          '--packages', str(args.packages),
+                                          '--indexes', str(args.indexes)])
+        footprint = int(output)
+        print "%-8s %8.1f MiB  %5d bytes per stanza" % (fmt, footprint / 1048576.0,
+                                                        footprint / (args.packages * args.indexes))
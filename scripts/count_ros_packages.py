@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import argparse
+import buildfarm.index_cache
 import buildfarm.repo
 import sys
 
@@ -29,6 +30,11 @@ if __name__ == "__main__":
 
     count = buildfarm.repo.count_packages(args.repo_url, args.rosdistro, args.distro, args.arch)
     print "Found %d packages matching: %s" % (count, args)
+    arch_counts = buildfarm.repo.get_arch_counts(args.repo_url, args.distro, args.arch)
+    print "By architecture: %s" % ', '.join('%s: %d' % (a, c) for a, c in sorted(arch_counts.items()))
+    bytes_saved = buildfarm.index_cache.get_default_cache().pdiff_bytes_saved
+    if bytes_saved:
+        print "Saved %d bytes of downloads by applying pdiffs" % bytes_saved
 
     min_num = int(args.count)
     if count > min_num:
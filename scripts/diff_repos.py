@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+import argparse
+import buildfarm.index_diff
+import buildfarm.repo
+import sys
+
+
+def parse_options():
+    parser = argparse.ArgumentParser(description="Report which packages a sync from one repo into another would add, remove, upgrade or downgrade.")
+    parser.add_argument("rosdistro",
+           help='The ros distro. electric, fuerte, groovy')
+    parser.add_argument("distro",
+           help='Ubuntu distro lucid, precise, etc')
+    parser.add_argument("arch",
+           help='The arch amd64 i386 or source')
+    parser.add_argument('--from-repo', dest='from_repo', action='store', default='http://50.28.27.175/repos/building',
+           help='The repo to sync from')
+    parser.add_argument('--to-repo', dest='to_repo', action='store', default='http://packages.ros.org/ros-shadow-fixed',
+           help='The repo to sync into')
+    parser.add_argument('--verbose', dest='verbose', action='store_true', default=False,
+           help='List every changed package')
+    parser.add_argument('--fail-on-downgrade', dest='fail_on_downgrade', action='store_true', default=False,
+           help='Return False if the sync would downgrade a package')
+
+    args = parser.parse_args()
+
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_options()
+
+    source = args.arch == 'source'
+    to_index = buildfarm.repo.get_Packages_index(args.to_repo, args.distro, args.arch, source=source)
+    from_index = buildfarm.repo.get_Packages_index(args.from_repo, args.distro, args.arch, source=source)
+    diff = buildfarm.index_diff.diff_indexes(to_index, from_index, 'ros-%s-' % args.rosdistro)
+
+    counts = diff.get_counts()
+    print "Syncing %s into %s for %s %s %s:" % (args.from_repo, args.to_repo, args.rosdistro, args.distro, args.arch)
+    print ', '.join('%d %s' % (counts[kind], kind) for kind in buildfarm.index_diff.CHANGE_KINDS)
+    if args.verbose:
+        for name, kind, old, new in diff.get_changed():
+            print "%-10s %s: %s -> %s" % (kind, name, old, new)
+    else:
+        for name, old, new in diff[buildfarm.index_diff.DOWNGRADED]:
+            print "downgraded %s: %s -> %s" % (name, old, new)
+
+    if args.fail_on_downgrade and counts[buildfarm.index_diff.DOWNGRADED]:
+        print "Sync would downgrade packages, return False"
+        sys.exit(1)
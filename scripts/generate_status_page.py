@@ -7,8 +7,13 @@ import os
 import sys
 import time
 
+from buildfarm.atomic_output import AtomicOutput, get_changed_files,\
+    read_hashes, write_hashes
 from buildfarm.status_page import build_version_cache,\
-    get_distro_arches, render_csv, transform_csv_to_html
+    get_distro_arches, get_status_changes, load_table_snapshot,\
+    make_status_state, make_status_table, read_csv_table,\
+    save_table_snapshot, write_csv, write_html, write_json
+from buildfarm.status_state import load_state, save_state
 
 
 def parse_options(args=sys.argv[1:]):
@@ -20,7 +25,17 @@ def parse_options(args=sys.argv[1:]):
     p.add_argument('--skip-fetch', action='store_true',
                    help='Skip fetching the apt data.')
     p.add_argument('--skip-csv', action='store_true',
-                   help='Skip generating .csv file.')
+                   help='Skip building the table and render the table'
+                   ' saved by the previous run again.')
+    p.add_argument('--no-csv', action='store_true',
+                   help='Do not export the table as .csv file.')
+    p.add_argument('--static-html', action='store_true',
+                   help='Put all rows into the .html file instead of'
+                   ' loading them from the .json feed, e.g. to view the'
+                   ' page without a web server.')
+    p.add_argument('--full', action='store_true',
+                   help='Ignore the state of the previous run and'
+                   ' regenerate the .html file.')
     p.add_argument('rosdistro', default='groovy',
                    help='The ROS distro to generate the status page'
                    ' for (i.e. groovy).')
@@ -43,6 +58,10 @@ def parse_options(args=sys.argv[1:]):
     p.add_argument('--da',
           nargs='+',
           help='Distro/Arch pairs to query')
+    p.add_argument('--jobs',
+          type=int,
+          help='Number of apt caches to build in parallel'
+          ' (default: number of cpus)')
     return p.parse_args(args)
 
 
@@ -64,19 +83,74 @@ if __name__ == '__main__':
         distro_arches = get_distro_arches(args.arches, args.rosdistro)
 
     csv_file = os.path.join(args.basedir, '%s.csv' % args.rosdistro)
+    html_file = os.path.join(args.basedir, '%s.html' % args.rosdistro)
+    json_file = os.path.join(args.basedir, '%s.json' % args.rosdistro)
+    # the time of the last check, as the page only shows when it changed
+    checked_file = os.path.join(args.basedir, '%s.checked' % args.rosdistro)
+    # not named <rosdistro>.* to stay out of the published files
+    state_file = os.path.join(args.basedir,
+                              '%s_status_state.json' % args.rosdistro)
+    changes_file = os.path.join(args.basedir,
+                                '%s_changes.txt' % args.rosdistro)
+    snapshot_file = os.path.join(args.basedir,
+                                 '%s_table.npz' % args.rosdistro)
+    # sha256 of the published files, and of the files as last uploaded
+    hashes_file = os.path.join(args.basedir, '%s.sha256' % args.rosdistro)
+    published_hashes_file = os.path.join(
+        args.basedir, '%s_published.sha256' % args.rosdistro)
+    publish_file = os.path.join(args.basedir,
+                                '%s_publish.txt' % args.rosdistro)
+    hashes = read_hashes(hashes_file)
+    table_changed = True
     if not args.skip_csv:
+        previous_state = None if args.full else load_state(state_file)
         print('Assembling apt version cache')
         version_cache = build_version_cache(args.basedir, args.rosdistro,
                                             distro_arches, ros_repos,
-                                            update=not args.skip_fetch)
-        print('Generating .csv file...')
-        render_csv(version_cache, args.basedir, csv_file, args.rosdistro,
-                   distro_arches, ros_repos)
-    elif not os.path.exists(csv_file):
-        print('.csv file "%s" is missing. Call script without "--skip-csv".' %\
-                  csv_file, file=sys.stderr)
+                                            update=not args.skip_fetch,
+                                            jobs=args.jobs)
+        changed_names = None
+        if previous_state is not None:
+            changed_names = previous_state.get_changed_names(
+                version_cache.fingerprints,
+                version_cache.get_index_versions(),
+                version_cache.get_row_name)
+            print('%d packages changed since the previous run' %
+                  len(changed_names))
+        print('Building the version table...')
+        table = make_status_table(version_cache, args.basedir,
+                                  args.rosdistro, distro_arches, ros_repos,
+                                  previous_state, changed_names)
+        state = make_status_state(table, version_cache)
+        if previous_state is not None:
+            table_changed = not state.has_same_table(previous_state)
+            changes = get_status_changes(previous_state, state,
+                                         changed_names)
+            with open(changes_file, 'w') as f:
+                for name, type_, column, change, repo in changes:
+                    line = '%s %s (%s)' % (change, name, type_)
+                    if column:
+                        line += ' %s %s' % (column, repo)
+                    print(line)
+                    f.write(line + '\n')
+            print('%d changes since the previous run written to "%s"' %
+                  (len(changes), changes_file))
+        save_state(state_file, state)
+        save_table_snapshot(table, snapshot_file)
+        if not args.no_csv:
+            print('Generating .csv file...')
+            hashes[os.path.basename(csv_file)] = write_csv(table, csv_file)
+    elif os.path.exists(snapshot_file):
+        print('Skip building the table, loading "%s"' % snapshot_file)
+        table = load_table_snapshot(snapshot_file)
+    elif os.path.exists(csv_file):
+        print('Skip building the table, reading "%s"' % csv_file)
+        with open(csv_file, 'r') as f:
+            table = read_csv_table(f)
     else:
-        print('Skip generating .csv file')
+        print('No table saved in "%s". Call script without "--skip-csv".' %\
+                  args.basedir, file=sys.stderr)
+        sys.exit(1)
 
     def metadata_builder(column_data):
         build_argstring = column_data.split('_')
@@ -115,13 +189,35 @@ if __name__ == '__main__':
 
         return data
 
-    print('Transforming .csv into .html file...')
-    with open(csv_file, 'r') as f:
-        html = transform_csv_to_html(f, metadata_builder,
-                                     args.rosdistro, start_time)
-    html_file = os.path.join(args.basedir, '%s.html' % args.rosdistro)
-    with open(html_file, 'w') as f:
-        f.write(html)
+    if not table_changed and os.path.exists(html_file) and \
+            (args.static_html or os.path.exists(json_file)):
+        print('Table unchanged, skip generating .html and .json files')
+    else:
+        print('Generating .json feed...')
+        hashes[os.path.basename(json_file)] = write_json(
+            table, json_file, args.rosdistro, start_time)
+        print('Generating .html file...')
+        feed_url = None if args.static_html else os.path.basename(json_file)
+        with AtomicOutput(html_file) as f:
+            write_html(table, metadata_builder, args.rosdistro, start_time, f,
+                       feed_url)
+        hashes[os.path.basename(html_file)] = f.sha256
+
+    # every output but the check time is written with a .gz sibling
+    with AtomicOutput(checked_file, compress=False) as f:
+        f.write(time.strftime('%Y-%m-%d %H:%M:%S %Z', start_time) + '\n')
+    hashes[os.path.basename(checked_file)] = f.sha256
+    compressed = [name for name in hashes
+                  if name != os.path.basename(checked_file)]
+    changed_files = get_changed_files(hashes,
+                                      read_hashes(published_hashes_file),
+                                      compressed=compressed)
+    write_hashes(hashes_file, hashes)
+    with AtomicOutput(publish_file, compress=False) as f:
+        for name in changed_files:
+            f.write(name + '\n')
+    print('%d files to publish listed in "%s"' %
+          (len(changed_files), publish_file))
 
     print('Symlinking jQuery resources...')
     dst = os.path.join(args.basedir, 'jquery')
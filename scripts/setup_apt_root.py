@@ -21,6 +21,10 @@ def parse_options():
            help='The rootdir to use')
     parser.add_argument('--local-conf-dir', dest='local_conf',
                       help='A directory to write an apt-conf to use with apt-get update.')
+    parser.add_argument('--ros-only', dest='ros_only', action='store_true', default=False,
+                      help='Only configure the --repo repositories, without the mirror.')
+    parser.add_argument('--no-sources', dest='sources', action='store_false', default=True,
+                      help='Do not fetch the Sources lists of the --repo repositories.')
     args = parser.parse_args()
 
     if not args.repo_urls:
@@ -39,7 +43,7 @@ def doit():
 
     ros_repos = buildfarm.apt_root.parse_repo_args(args.repo_urls)
 
-    buildfarm.apt_root.setup_apt_rootdir(args.rootdir, args.distro, args.architecture, mirror=args.mirror, additional_repos=ros_repos)
+    buildfarm.apt_root.setup_apt_rootdir(args.rootdir, args.distro, args.architecture, mirror=args.mirror, additional_repos=ros_repos, ros_only=args.ros_only, sources=args.sources)
     if args.local_conf:
         buildfarm.apt_root.setup_conf(args.rootdir, args.local_conf)
 
@@ -51,6 +51,7 @@ import rosdeb
 from rosdeb import debianize_name, debianize_version, rosdistro, targets, list_missing
 from rosdeb.rosutil import send_email
 from rosdeb.source_deb import download_control
+from buildfarm.deb822 import iter_stanzas
 
 NAME = 'build_debs.py'
 TARBALL_URL = "https://code.ros.org/svn/release/download/stacks/%(stack_name)s/%(base_name)s/%(f_name)s"
@@ -532,29 +533,17 @@ def build_debs(distro, stack_name, os_platform, arch, staging_dir, force, nouplo
 EMAIL_FROM_ADDR = 'ROS debian build system <noreply@osrfoundation.org>'
 
 
-def parse_deb_packages(text):
+def parse_deb_packages(lines):
+    """
+    @param lines: the Packages list as an iterable of lines, such as
+    an open file or url
+    """
     parsed = {}
-    (key, val, pkg) = (None, '', {})
-    count = 0
-    for l in text.split('\n'):
-        count += 1
-        if len(l) == 0:
-            if len(pkg) > 0:
-                if not 'Package' in pkg:
-                    print 'INVALID at %d' % count
-                else:
-                    if key:
-                        pkg[key] = val
-                    parsed[pkg['Package']] = pkg
-                    (key, val, pkg) = (None, '', {})
-        elif l[0].isspace():
-            val += '\n' + l.strip()
+    for count, pkg in enumerate(iter_stanzas(lines)):
+        if not 'Package' in pkg:
+            print 'INVALID stanza %d' % count
         else:
-            if key:
-                pkg[key] = val
-            (key, val) = l.split(':', 1)
-            key = key.strip()
-            val = val.strip()
+            parsed[pkg['Package']] = pkg
 
     return parsed
 
@@ -624,14 +613,14 @@ def gen_metapkgs(distro, os_platform, arch, staging_dir, repo_fqdn, force=False)
     # Retrieve the package list from the shadow repo
     packageurl = repo_url(repo_fqdn) + "/dists/%(os_platform)s/main/binary-%(arch)s/Packages" % locals()
     try:
-        packagetxt = urllib2.urlopen(packageurl).read()
+        packages_file = urllib2.urlopen(packageurl)
     except urllib2.URLError as ex:
         print "Failed to open url: %s with error %s" % (packageurl, ex)
         raise ex
     except: 
         print "Failed to open url: %s" % (packageurl)
         raise
-    packagelist = parse_deb_packages(packagetxt)
+    packagelist = parse_deb_packages(packages_file)
 
     debs = []
 
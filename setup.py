@@ -21,6 +21,7 @@ setup(
         'scripts/count_ros_packages.py',
         'scripts/create_release_jobs.py',
         'scripts/create_static_jobs.py',
+        'scripts/diff_repos.py',
         'scripts/generate_sourcedeb',
         'scripts/generate_status_page.py',
         'scripts/setup_apt_root.py',
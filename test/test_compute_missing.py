@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+import unittest
+
+from buildfarm import release_jobs, repo, ros_distro
+
+
+class FakeRosdistro(object):
+
+    def __init__(self, rosdistro):
+        pass
+
+    def get_target_distros(self):
+        return ['heisenbug']
+
+    def get_package_list(self):
+        return ['foo', 'bar']
+
+    def get_version(self, name, full_version=False):
+        return {'foo': '1.2.3-0', 'bar': '0.1-2'}[name]
+
+
+class FakeIndex(object):
+
+    def __init__(self, versions):
+        self._versions = versions
+
+    def __contains__(self, name):
+        return name in self._versions
+
+    def has_version(self, name, version, full_match=True):
+        return self._versions.get(name) == version
+
+
+class FakeDistro(object):
+    stacks = ['qux']
+
+
+class ComputeMissingTest(unittest.TestCase):
+
+    def setUp(self):
+        self._saved = [(ros_distro, 'Rosdistro', ros_distro.Rosdistro),
+                       (repo, 'prefetch_rpm_indexes', repo.prefetch_rpm_indexes),
+                       (repo, 'get_rpm_index', repo.get_rpm_index),
+                       (release_jobs, 'load_distro', release_jobs.load_distro),
+                       (release_jobs, 'dry_get_stack_version', release_jobs.dry_get_stack_version)]
+        ros_distro.Rosdistro = FakeRosdistro
+        release_jobs.load_distro = lambda uri: FakeDistro()
+        release_jobs.dry_get_stack_version = lambda stack, dist: '0.5.0'
+        self.failed = {}
+        self.indexes = {}
+        repo.prefetch_rpm_indexes = lambda targets: self.failed
+        repo.get_rpm_index = lambda repo_url, d, a, cache=None, source=False: self.indexes[(d, a)]
+
+    def tearDown(self):
+        for module, name, value in self._saved:
+            setattr(module, name, value)
+
+    def test_unavailable_index(self):
+        all_present = FakeIndex({'ros-hydro-foo': '1.2.3-0',
+                                 'ros-hydro-bar': '0.1-2',
+                                 'ros-hydro-qux': '0.5.0'})
+        self.indexes = {('heisenbug', 'SRPMS'): all_present,
+                        ('heisenbug', 'x86_64'): all_present}
+        # the i386 index of a new arch cannot be fetched yet
+        self.failed = {('http://localhost/repos/building', 'heisenbug', 'i386', False):
+                       repo.BadRepo('404')}
+        missing = release_jobs.compute_missing(None, ['x86_64', 'i386'], 'localhost', 'hydro')
+        self.assertEqual(missing, {'foo': ['heisenbug_i386'],
+                                   'bar': ['heisenbug_i386'],
+                                   'qux': ['heisenbug_i386']})
+
+
+if __name__ == '__main__':
+    unittest.main()